@@ -0,0 +1,81 @@
+"""Async views on one event loop per worker process.
+
+Flask runs an `async def` view by handing it to asgiref, which starts a new
+event loop for every call. Clients bound to the loop they were first used
+on (PyMongo's AsyncMongoClient, the gRPC channel behind Gemini's
+generate_content_async) can't be shared between those loops, so each
+request would reconnect. AsyncApp sends every async view to one long-lived
+loop running in a background thread instead. The request thread only waits
+for the result, while the MongoDB and Gemini I/O of all in-flight async
+requests of the worker is multiplexed on that loop.
+
+Code on the loop must never block it: await the async clients and push
+anything synchronous (the sync MongoDB client, bcrypt, file I/O) through
+asyncio.to_thread, which keeps Flask's request context.
+"""
+import asyncio
+import functools
+import logging
+import os
+import threading
+
+from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopThread:
+    """An event loop running forever in a daemon thread, started on first use.
+
+    Like the MongoDB client it is rebuilt after fork(), since the thread
+    running it doesn't survive into the child.
+    """
+
+    def __init__(self, name='event-loop'):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        pid = os.getpid()
+        if self._loop is None or self._pid != pid:
+            with self._lock:
+                if self._loop is None or self._pid != pid:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=loop.run_forever, name=self.name, daemon=True)
+                    thread.start()
+                    self._loop, self._thread, self._pid = loop, thread, pid
+                    logger.info("Started event loop for pid %s", pid)
+        return self._loop
+
+    def run(self, coro):
+        """Run `coro` on the loop and block until it finishes, returning its result.
+
+        The coroutine runs in a copy of the caller's context, so Flask's
+        request, g and current_app work inside it.
+        """
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            coro.close()
+            # Waiting here would block the very loop the coroutine needs
+            raise RuntimeError('EventLoopThread.run() called on its own loop; await the coroutine instead')
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+class AsyncApp(Flask):
+    """A Flask app whose async views all run on its per-process event loop."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.extensions['event_loop'] = EventLoopThread()
+
+    def async_to_sync(self, func):
+        event_loop = self.extensions['event_loop']
+
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            return event_loop.run(func(*args, **kwargs))
+        return run
@@ -1,26 +1,98 @@
-import os
+import asyncio
 import logging
-from flask import Flask, request, jsonify
-from pymongo import MongoClient
-import bcrypt
+import click
+from flask import Blueprint, Response, current_app, g, request, jsonify, stream_with_context
 from flask_cors import CORS
+from werkzeug.datastructures import MultiDict
+from werkzeug.local import LocalProxy
 import re
+import json
+import math
+import base64
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 from bson import ObjectId
-
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "http://localhost:5173"}})
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING, DeleteMany, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from aio import AsyncApp
+from auth import init_auth, issue_token, login_required, role_required
+from config import get_config
+from mongo import Mongo
+from indexes import ensure_indexes, explain_route_queries
+from description_cache import create_description_cache, version_key
+from migrations import merge_duplicate_cart_lines, migrate_booking_types, parse_datetime
+from reservations import RELEASES_STOCK, STATUS_TRANSITIONS, InvalidQuantity, OutOfStock, ReservationError, book_items_async, to_object_id, transition_bookings
+from request_logging import configure_logging, init_request_logging
+from metrics import GEMINI_FALLBACKS, init_metrics, time_gemini
+from model_gateway import GatewayError, ModelGateway
+from catalogue import PRICE_FIELDS, CatalogueSnapshot, serialize_product
+from http_cache import CatalogueVersion, ResponseCache, cached_response, make_etag, not_modified
+from varieties import VarietyStore, load_records
+from passwords import AuthPoolFull, init_passwords
+
+bp = Blueprint('api', __name__, cli_group=None)
+# Logging is configured by create_app (see request_logging.py)
 logger = logging.getLogger(__name__)
 
-# MongoDB connection
-MONGO_URI = os.environ.get("MONGO_URI")
-client = MongoClient(MONGO_URI)
-db = client["mydatabase"]  # Replace with your actual database name
-users_collection = db["users"]
-products_collection = db["products"]  # New collection for storing products
-cart_collection = db["cart"]
-bookings_collection = db["bookings"]
+
+def _extension(name):
+    """Proxy to a service create_app built for the current app."""
+    return LocalProxy(lambda: current_app.extensions[name])
+
+
+# Each app gets its own services, built by create_app and kept in
+# app.extensions; routes reach them through these proxies.
+
+# MongoDB connection, created lazily per process from the app config
+mongo = _extension('mongo')
+
+# Catalogue reads are served from already-serialized responses keyed by a
+# version counter that every product or stock change bumps (see http_cache.py)
+catalogue_version = _extension('catalogue_version')
+response_cache = _extension('response_cache')
+
+# bcrypt pool (see passwords.py)
+passwords = _extension('passwords')
+
+# Product fields needed to render a cart line
+CART_PRODUCT_PROJECTION = {
+    'name': 1,
+    'price_registered': 1,
+    'imageUrl': 1,
+    'description': 1,
+    'stock': 1,
+    'krishiBhavan': 1
+}
+
+# Fields returned by GET /products
+PRODUCT_LIST_PROJECTION = {
+    'name': 1,
+    'description': 1,
+    'price_registered': 1,
+    'price_unregistered': 1,
+    'stock': 1,
+    'category': 1,
+    'krishiBhavan': 1,
+    'imageUrl': 1
+}
+PRODUCT_SORT_FIELDS = ('_id', 'name', 'price', 'stock')
+MAX_PRODUCTS_PAGE_SIZE = 100
+# GET /products requests using only these arguments are served from the catalogue snapshot
+SNAPSHOT_ARGS = {'category', 'krishiBhavan', 'user_type'}
+MAX_CART_BATCH_SIZE = 200
+DEFAULT_SELLER_PAGE_SIZE = 50
+MAX_SELLER_PAGE_SIZE = 200
+# Newest first; the only order /seller/bookings pages through
+SELLER_BOOKINGS_SORT = '-booking_date_time'
+MAX_STATUS_BATCH_SIZE = 1000
+# User fields a profile update may change
+PROFILE_FIELDS = ("name", "email", "phone", "address", "pincode")
+USER_ROLES = ('customer', 'seller')
+
+# In-memory, pre-serialized product list for the common /products queries (see catalogue.py)
+catalogue = _extension('catalogue')
+
 
 
 
@@ -37,10 +109,24 @@ def _corsify_actual_response(response):
 
 # ======================= USER AUTHENTICATION ========================== #
 
-@app.route('/register', methods=['POST'])
+def _auth_busy_response():
+    logger.warning("Auth pool is full, rejecting request")
+    response = jsonify({'error': 'Server is busy, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def _token_response(user_id, role, krishi_bhavan=None):
+    return {
+        'token': issue_token(user_id, role, krishi_bhavan),
+        'token_type': 'Bearer',
+        'expires_in': current_app.config['ACCESS_TOKEN_TTL']
+    }
+
+
+@bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
-    logger.info("Received registration data: %s", data)
+    logger.info("Received registration request", extra={'fields': {'email': data.get('email'), 'role': data.get('role')}})
 
     # Validate data
     errors = {}
@@ -56,13 +142,23 @@ def register():
         errors['password'] = 'Password is required'
     elif len(data['password']) < 8:
         errors['password'] = 'Password must be at least 8 characters'
+    # Tokens carry the role, so sign-up can only ever create customers;
+    # sellers are made with `flask --app app set-role`
+    role = data.get('role') or 'customer'
+    if role not in USER_ROLES:
+        errors['role'] = 'Role must be customer or seller'
+    elif role != 'customer':
+        errors['role'] = 'Seller accounts are created by an administrator'
 
     if errors:
-        logger.error("Validation errors: %s", errors)
+        logger.error("Registration validation failed", extra={'fields': {'error_fields': sorted(errors)}})
         return jsonify({'errors': errors}), 400
 
     # Hash the password
-    hashed_password = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt())
+    try:
+        hashed_password = passwords.hash(data['password'])
+    except AuthPoolFull:
+        return _auth_busy_response()
 
     # Store data in MongoDB
     user = {
@@ -73,32 +169,52 @@ def register():
         'pincode': data.get('pincode'),
         'password': hashed_password,
         'uniqueId': data.get('uniqueId'),
-        'role': data['role']
+        'role': role
     }
-    users_collection.insert_one(user)
-    logger.info("User registered successfully: %s", user)
-
-    return jsonify({'message': 'User registered successfully', 'id': str(user['_id'])}), 201
+    try:
+        mongo.db.users.insert_one(user)
+    except DuplicateKeyError:
+        logger.error("Registration failed: email %s is already registered", data['email'])
+        return jsonify({'errors': {'email': 'Email is already registered'}}), 409
+    logger.info("User registered successfully", extra={'fields': {'user_id': str(user['_id'])}})
+
+    return jsonify({
+        'message': 'User registered successfully',
+        'id': str(user['_id']),
+        'role': user['role'],
+        **_token_response(user['_id'], user['role'])
+    }), 201
 
 
-@app.route('/login', methods=['POST'])
+@bp.route('/login', methods=['POST'])
 def login():
     data = request.get_json()
-    logger.info("Received login data: %s", data)
 
     # Validate data
     if not data.get('email') or not data.get('password'):
         return jsonify({'error': 'Email and password are required'}), 400
 
     # Find user in MongoDB
-    user = users_collection.find_one({'email': data['email']})
+    user = mongo.db.users.find_one({'email': data['email']})
     if not user:
         return jsonify({'error': 'Invalid credentials'}), 401
 
     # Check password
-    if not bcrypt.checkpw(data['password'].encode('utf-8'), user['password']):
+    try:
+        password_ok = passwords.check(data['password'], user['password'])
+    except AuthPoolFull:
+        return _auth_busy_response()
+    if not password_ok:
         return jsonify({'error': 'Invalid credentials'}), 401
 
+    # Transparently upgrade hashes made with an older work factor
+    if passwords.needs_rehash(user['password']):
+        users = mongo.db.users  # The callback runs outside the app context
+        passwords.rehash_in_background(
+            data['password'],
+            lambda new_hash: users.update_one({'_id': user['_id']}, {'$set': {'password': new_hash}})
+        )
+
     # Return user data
     user_data = {
         'id': str(user['_id']),
@@ -110,58 +226,68 @@ def login():
         'uniqueId': user['uniqueId'],
         'role': user.get('role', 'user')
     }
-    logger.info("User logged in successfully: %s", user_data)
+    if user_data['role'] == 'seller':
+        user_data['krishiBhavan'] = user.get('krishiBhavan')
+    user_data.update(_token_response(user['_id'], user_data['role'], user_data.get('krishiBhavan')))
+    logger.info("User logged in successfully", extra={'fields': {'user_id': user_data['id']}})
     return jsonify(user_data), 200
 
-@app.route('/update-profile', methods=['PUT'])
+@bp.cli.command('set-role')
+@click.argument('email')
+@click.argument('role', type=click.Choice(USER_ROLES))
+@click.option('--krishi-bhavan', help='Office a seller manages bookings for (required for sellers).')
+def set_role(email, role, krishi_bhavan):
+    """Make an existing account a seller, or a customer again.
+
+    Takes effect when the user next logs in; tokens already issued keep
+    their old role until they expire (ACCESS_TOKEN_TTL).
+    """
+    if role == 'seller' and not krishi_bhavan:
+        raise click.UsageError('Sellers need --krishi-bhavan')
+    if role == 'seller':
+        update = {'$set': {'role': role, 'krishiBhavan': krishi_bhavan}}
+    else:
+        update = {'$set': {'role': role}, '$unset': {'krishiBhavan': ''}}
+    result = mongo.db.users.update_one({'email': email}, update)
+    if not result.matched_count:
+        raise click.ClickException(f'No user is registered with {email}')
+    logger.info("Set role of %s to %s (%s)", email, role, krishi_bhavan or 'no Krishi Bhavan')
+
+@bp.route('/update-profile', methods=['PUT'])
+@login_required
 def update_profile():
     data = request.get_json()
-    logger.info("Received update profile data: %s", data)  # Log the received data
-    user_id = data.get('userId')
-
-    if not user_id:
-        return jsonify({'error': 'User ID is required'}), 400
-
-    # try:
-    #     user_id = ObjectId(user_id)  # Convert string to MongoDB ObjectId
-    # except:
-    #     return jsonify({'error': 'Invalid user ID format'}), 400
-
-    # Fetch existing user data to compare changes
-    _id = ObjectId(user_id)
-    existing_user = users_collection.find_one({"_id": _id}, {"password": 0})
-    if not existing_user:
-        return jsonify({'error': 'User not found'}), 404
-
-    # Build an update dictionary with only changed fields
-    updated_data = {}
-    for field in ["name", "email", "phone", "address", "pincode"]:
-        if field in data and data[field] and data[field] != existing_user.get(field):
-            updated_data[field] = data[field]
+    user_id = g.user_id
 
-    if not updated_data:  # No changes detected
+    updated_data = {field: data[field] for field in PROFILE_FIELDS if data.get(field)}
+    if not updated_data:
         logger.info("No updates were made for user ID: %s", user_id)
         return jsonify({'error': 'No updates were made'}), 400
 
-    # Update the user in MongoDB
-    result = users_collection.update_one({"_id": _id}, {"$set": updated_data})
-
-    if result.modified_count == 0:
-        return jsonify({'error': 'Failed to update profile'}), 400
-
-    # Fetch the updated user data
-    updated_user = users_collection.find_one({"_id": _id}, {"password": 0})  # Exclude password
+    # One round trip: apply the changes and get the updated document back
+    try:
+        updated_user = mongo.db.users.find_one_and_update(
+            {'_id': ObjectId(user_id)},
+            {'$set': updated_data},
+            projection={'password': 0},  # Exclude password
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        return jsonify({'errors': {'email': 'Email is already registered'}}), 409
+    if not updated_user:
+        return jsonify({'error': 'User not found'}), 404
     updated_user['id'] = str(updated_user.pop('_id'))  # Rename _id to id
 
-    logger.info("Profile updated successfully for user data: %s", updated_user)
+    logger.info("Profile updated successfully", extra={'fields': {'user_id': user_id, 'updated_fields': sorted(updated_data)}})
     return jsonify({'message': 'Profile updated successfully', 'user': updated_user}), 200
 
 # ========================== PRODUCT MANAGEMENT ========================== #
 
-@app.route('/products', methods=['POST'])
+@bp.route('/products', methods=['POST'])
+@login_required
+@role_required('seller')
 def add_product():
     data = request.get_json()
-    logger.info("Received product data: %s", data)
 
     # Validate input
     if not data.get('name') or not data.get('price_registered') or not data.get('price_unregistered') or not data.get('category'):
@@ -178,165 +304,506 @@ def add_product():
         "imageUrl": data.get('imageUrl', '')
     }
 
-    result = products_collection.insert_one(product)
-    logger.info("Product added: %s", product)
+    result = mongo.db.products.insert_one(product)
+    catalogue_version.bump()
+    logger.info("Product added", extra={'fields': {'product_id': str(result.inserted_id)}})
 
     return jsonify({'message': 'Product added successfully', 'id': str(result.inserted_id)}), 201
 
 
 
-@app.route('/products', methods=['GET'])
-def get_products():
-    products = list(products_collection.find())
-    products_list = [
-        {
-            'id': str(product['_id']),
-            'name': product['name'],
-            'description': product.get('description', ''),
-            'price_registered': product.get('price_registered', 0),  # Default to 0 if not found
-            'price_unregistered': product.get('price_unregistered', 0),
-            'stock': product.get('stock', 0),
-            'category': product['category'],
-            'krishiBhavan': product.get('krishiBhavan', ''),
-            'imageUrl': product.get('imageUrl', '')
-        }
-        for product in products
-    ]
-    return jsonify(products_list), 200
+def _encode_cursor(sort, sort_value, last_id):
+    payload = json.dumps({'s': sort, 'v': sort_value, 'id': str(last_id)})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
 
+def _decode_cursor(cursor, sort):
+    """(sort value, last _id) from a cursor; raises ValueError unless it was made for `sort`."""
+    payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    if payload.get('s') != sort:
+        # Resuming one ordering from another's position silently skips or repeats rows
+        raise ValueError(f"cursor was made for sort {payload.get('s')!r}, not {sort!r}")
+    return payload['v'], ObjectId(payload['id'])
 
-@app.route('/products/<product_id>', methods=['PUT'])
+
+def _number_arg(name, convert):
+    """Query argument `name` converted with int or float, or None if absent.
+
+    Raises ValueError for anything else, unlike request.args.get(type=...),
+    which quietly treats a malformed value as missing.
+    """
+    value = request.args.get(name)
+    if value in (None, ''):
+        return None
+    number = convert(value)
+    if not math.isfinite(number):
+        raise ValueError(f'{name} must be finite')
+    return number
+
+
+@bp.route('/products', methods=['GET'])
+def get_products():
+    cache_control = current_app.config['PRODUCTS_CACHE_CONTROL']
+    user_type = request.args.get('user_type') or None
+    if catalogue.mode != 'off' and request.args.keys() <= SNAPSHOT_ARGS and user_type in (None, *PRICE_FIELDS):
+        body, etag = catalogue.get(request.args.get('category') or None, request.args.get('krishiBhavan') or None,
+                                   user_type)
+        return cached_response({'body': body, 'etag': etag, 'headers': {}}, cache_control)
+
+    # The same query against the same catalogue version always gives the
+    # same bytes, so the ETag is known before touching the products
+    version = catalogue_version.get()
+    query_string = request.query_string.decode('utf-8')
+    etag = make_etag('products', version, query_string)
+    response = not_modified(etag, cache_control)
+    if response is not None:
+        return response
+    cache_key = ('products', version, query_string)
+    entry = response_cache.get(cache_key)
+    if entry is not None:
+        return cached_response(entry, cache_control)
+
+    user_type = request.args.get('user_type')
+    if user_type and user_type not in PRICE_FIELDS:
+        return jsonify({'error': 'user_type must be registered or unregistered'}), 400
+    price_field = PRICE_FIELDS[user_type or 'registered']
+
+    try:
+        min_price = _number_arg('min_price', float)
+        max_price = _number_arg('max_price', float)
+    except ValueError:
+        return jsonify({'error': 'min_price and max_price must be numbers'}), 400
+    try:
+        limit = _number_arg('limit', int)
+        if limit is not None and not 1 <= limit <= MAX_PRODUCTS_PAGE_SIZE:
+            raise ValueError(limit)
+    except ValueError:
+        return jsonify({'error': f'limit must be an integer between 1 and {MAX_PRODUCTS_PAGE_SIZE}'}), 400
+
+    sort = request.args.get('sort', '_id')
+    direction = DESCENDING if sort.startswith('-') else ASCENDING
+    sort_key = sort.lstrip('-')
+    if sort_key not in PRODUCT_SORT_FIELDS:
+        return jsonify({'error': f"sort must be one of {', '.join(PRODUCT_SORT_FIELDS)}"}), 400
+    sort_field = price_field if sort_key == 'price' else sort_key
+
+    # Cursors are tied to the field and direction they were made for (a
+    # price cursor differs per user_type)
+    cursor_sort = ('-' if direction == DESCENDING else '') + sort_field
+    cursor = request.args.get('cursor')
+    try:
+        last_value, last_id = _decode_cursor(cursor, cursor_sort) if cursor else (None, None)
+    except (ValueError, KeyError, TypeError, InvalidId):
+        return jsonify({'error': 'Invalid pagination cursor'}), 400
+
+    query = {}
+    if request.args.get('category'):
+        query['category'] = request.args['category']
+    if request.args.get('krishiBhavan'):
+        query['krishiBhavan'] = request.args['krishiBhavan']
+    if request.args.get('q'):
+        pattern = {'$regex': re.escape(request.args['q']), '$options': 'i'}
+        query['$or'] = [{'name': pattern}, {'description': pattern}, {'category': pattern}]
+    if min_price is not None or max_price is not None:
+        query[price_field] = {}
+        if min_price is not None:
+            query[price_field]['$gte'] = min_price
+        if max_price is not None:
+            query[price_field]['$lte'] = max_price
+
+    # Keyset pagination: resume strictly after the last (sort value, _id) seen
+    if last_id is not None:
+        op = '$lt' if direction == DESCENDING else '$gt'
+        if sort_field == '_id':
+            keyset = {'_id': {op: last_id}}
+        else:
+            keyset = {'$or': [
+                {sort_field: {op: last_value}},
+                {sort_field: last_value, '_id': {op: last_id}}
+            ]}
+        query = {'$and': [query, keyset]} if query else keyset
+
+    projection = dict(PRODUCT_LIST_PROJECTION)
+    if user_type:
+        projection.pop(PRICE_FIELDS['unregistered' if user_type == 'registered' else 'registered'])
+
+    sort_spec = [(sort_field, direction)]
+    if sort_field != '_id':
+        sort_spec.append(('_id', direction))
+    products = mongo.secondary_db.products.find(query, projection).sort(sort_spec)
+    if limit:
+        # Fetch one extra document to know whether another page exists
+        products = products.limit(limit + 1)
+    products = list(products)
+
+    next_cursor = None
+    if limit and len(products) > limit:
+        products = products[:limit]
+        last = products[-1]
+        next_cursor = _encode_cursor(cursor_sort, last.get(sort_field) if sort_field != '_id' else None, last['_id'])
+
+    price_fields = [field for field in PRICE_FIELDS.values() if field in projection]
+    products_list = [serialize_product(product, price_fields) for product in products]
+
+    entry = response_cache.put(cache_key, current_app.json.dumps(products_list), etag,
+                               headers={'X-Next-Cursor': next_cursor} if next_cursor else None,
+                               ttl=current_app.config['PRODUCTS_CACHE_TTL'])
+    return cached_response(entry, cache_control)
+
+
+@bp.route('/products/<product_id>', methods=['PUT'])
+@login_required
+@role_required('seller')
 def update_product(product_id):
     data = request.get_json()
-    logger.info(f"Updating product {product_id} with data: {data}")
+    logger.info("Updating product", extra={'fields': {'product_id': product_id, 'updated_fields': sorted(data)}})
 
     if not ObjectId.is_valid(product_id):
         return jsonify({'error': 'Invalid product ID'}), 400
 
     update_data = {key: value for key, value in data.items() if value is not None}
 
-    result = products_collection.update_one({'_id': ObjectId(product_id)}, {'$set': update_data})
+    result = mongo.db.products.update_one({'_id': ObjectId(product_id)}, {'$set': update_data})
     if result.matched_count == 0:
         return jsonify({'error': 'Product not found'}), 404
+    catalogue_version.bump()
 
     return jsonify({'message': 'Product updated successfully'}), 200
 
 
-@app.route('/products/<product_id>', methods=['DELETE'])
+@bp.route('/products/<product_id>', methods=['DELETE'])
+@login_required
+@role_required('seller')
 def delete_product(product_id):
-    logger.info(f"Deleting product with ID: {product_id}")
+    logger.info("Deleting product", extra={'fields': {'product_id': product_id}})
 
     if not ObjectId.is_valid(product_id):
         return jsonify({'error': 'Invalid product ID'}), 400
 
-    result = products_collection.delete_one({'_id': ObjectId(product_id)})
+    result = mongo.db.products.delete_one({'_id': ObjectId(product_id)})
     if result.deleted_count == 0:
         return jsonify({'error': 'Product not found'}), 404
+    catalogue_version.bump()
 
     return jsonify({'message': 'Product deleted successfully'}), 200
 
 # ===================================================================== #
 # Configure Gemini API
-from dotenv import load_dotenv
 import google.generativeai as genai
 
-load_dotenv()
-
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-gemini_model = genai.GenerativeModel("gemini-2.0-flash")
-
-# Cache for storing product details
-cache = {}
-
-# Product data (same as frontend)
-products = [
-    {"id": 1, "name": "Moovandan", "type": "Mango", "image": "https://www.fortheloveofnature.in/cdn/shop/products/Mangiferaindica-Moovandan_Mango_1_823x.jpg?v=1640246605", "description": "A Popular Early-Bearing Variety"},
-    {"id": 2, "name": "Kilichundan Mango", "type": "Mango", "image": "https://www.greensofkerala.com/wp-content/uploads/2021/04/kilichundan-manga-2.gif", "description": "The Parrot-Beak Mango with a Tangy-Sweet Flavor"},
-    {"id": 3, "name": "Neelum", "type": "Mango", "image": "https://tropicaltreeguide.com/wp-content/uploads/2023/04/Mango_Neelum_Fruit_IG_Botanical_Diversity_3-1024x1014.jpg", "description": "A High-Yielding and Disease-Resistant Variety of Mango"},
-    {"id": 4, "name": "Alphonso", "type": "Mango", "image": "https://seed2plant.in/cdn/shop/files/AlphonsoMangoGraftedLivePlant.jpg?v=1689071379&width=1100", "description": "The King of Mangoes"},
-    {"id": 5, "name": "Cowpea", "type": "Bean", "image": "https://seed2plant.in/cdn/shop/products/cowpeaseeds.jpg?v=1603962956&width=1780", "description": "Drought-tolerant legume"},
-    {"id": 6, "name": "Yardlong Bean", "type": "Bean", "image": "https://m.media-amazon.com/images/I/61GCtRXQUNL.jpg", "description": "Locally known as Achinga Payar is a popular vegetable characterized by its slender, elongated pods"},
-    {"id": 7, "name": "Winged Bean", "type": "Bean", "image": "https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcTyx8m47r2uid8bsBjhInQs9nlpFmuBXKfT6w&s", "description": "Locally known as Kaippayar, this nutrient-rich bean is characterized by its winged edges and high protein content."},
-    {"id": 8, "name": "Sword Bean", "type": "Bean", "image": "https://goldenhillsfarm.in/media/product_images/sward-beans.jpg", "description": "Known as Valpayar, this variety has thick, broad pods and is often used in traditional Kerala dishes."},
-    {"id": 9, "name": "Nendran", "type": "Banana", "image": "https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcQqNbKet5tI1Uh_bAZgjTNB0RPSInNnPKkN8A&s", "description": "A prominent variety in Kerala, Nendran bananas are large, firm, and slightly sweet"},
-    {"id": 10, "name": "Chengalikodan Nendran",  "type": "Banana", "image": "https://www.gikerala.in/images/products/Chengalikkodan_Nendran-Banana-4.webp", "description": "Originating from the Chengazhikodu village in Thrissur District, this variety is renowned for its unique taste and vibrant color."},
-    {"id": 11, "name": "Matti Pazham", "type": "Banana", "image": "https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcT9r6XZqXhdCNS3xpTSTkoVXHbo38K_Q1K__g&s", "description": "Known for its fragrant aroma and honey-like taste, this small-sized banana is cherished for its unique flavor profile."},
-    {"id": 12, "name": "Poovan", "type": "Banana", "image": "https://upload.wikimedia.org/wikipedia/commons/thumb/b/ba/Kerala_Banana_-_Poovan_Pazham-1.jpg/1200px-Kerala_Banana_-_Poovan_Pazham-1.jpg?20110717070644", "description": "A popular dessert banana, Poovan is medium-sized with a thin skin and sweet flesh."}
-]
-
-@app.route('/get_product_details', methods=['GET'])
-def get_product_details():
-    try:
-        product_id = request.args.get('id', type=int)  # Convert ID to integer
-        product = next((p for p in products if p["id"] == product_id), None)
-
-        if not product:
-            return jsonify({"error": "Product not found"}), 404
-
-        # Check cache to prevent multiple responses
-        if product_id in cache:
-            return jsonify(cache[product_id])
+# All calls go through the gateway (rate limits, timeouts, coalescing; see
+# model_gateway.py), never the model directly.
+gemini = _extension('gemini')
+
+
+def _create_gemini(config):
+    if config.get('GEMINI_FAKE'):
+        # Offline stand-in for local benchmarking
+        from fake_model import FakeGenerativeModel
+        gemini_model = FakeGenerativeModel(config['GEMINI_MODEL_NAME'])
+    else:
+        genai.configure(api_key=config.get('GEMINI_API_KEY'))
+        gemini_model = genai.GenerativeModel(config['GEMINI_MODEL_NAME'])
+    return ModelGateway(
+        gemini_model,
+        max_concurrency=config['GEMINI_MAX_CONCURRENCY'],
+        rate=config['GEMINI_RATE_PER_SECOND'],
+        burst=config['GEMINI_BURST'],
+        timeout=config['GEMINI_TIMEOUT'],
+        queue_timeout=config['GEMINI_QUEUE_TIMEOUT'],
+        quota_cooldown=config['GEMINI_QUOTA_COOLDOWN'],
+        timer=time_gemini
+    )
 
-        # Generate AI description (only if not cached)
-        prompt = f"""
-                Provide a structured description of {product['name']} ({product['type']}) including:
+# Prompt used to generate the detailed product description
+PRODUCT_DETAILS_PROMPT = """
+                Provide a structured description of {name} ({type}) including:
                 - **Origin and History**
                 - **Climate and Growth Conditions**
                 - **Nutritional Value & Benefits**
                 - **Uses in Cooking & Daily Life**
                 Keep it clear, detailed, and informative.
                 """
-        response = gemini_model.generate_content(prompt)
-
-        product_data = {
-            "id": product["id"],
-            "name": product["name"],
-            "image": product["image"],
-            "description": product["description"],
-            "detailed_info": response.text  # AI-generated text
-        }
 
-        # Store response in cache
-        cache[product_id] = product_data
+# Cache for storing product details, versioned by the prompt template
+cache = _extension('description_cache')
+
+# Crop varieties for the product details page (see varieties.py)
+varieties = _extension('varieties')
+
+def _static_product_details(product):
+    return {
+        "id": product["id"],
+        "name": product["name"],
+        "image": product["image"],
+        "description": product["description"]
+    }
+
+
+def _description_key(product):
+    # Editing a variety bumps its version, which retires only its own description
+    return f"{product['id']}:v{product.get('version', 0)}"
+
+
+def _details_prompt(product):
+    return PRODUCT_DETAILS_PROMPT.format(name=product['name'], type=product['type'])
+
 
-        return jsonify(product_data)
+async def _generate_product_details(product):
+    product_data = _static_product_details(product)
+    product_data["detailed_info"] = await gemini.generate_async(_details_prompt(product))  # AI-generated text
+    return product_data
+
+
+def _fallback_product_details(product, error):
+    # Serve the static description now; the model is tried again on a later request
+    logger.warning("Serving static description for product %s: %s", product['id'], error)
+    GEMINI_FALLBACKS.inc(type(error).__name__)
+    product_data = _static_product_details(product)
+    product_data["detailed_info"] = product["description"]
+    product_data["fallback"] = True
+    return product_data
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@bp.route('/get_product_details', methods=['GET'])
+async def get_product_details():
+    try:
+        product_id = request.args.get('id', type=int)  # Convert ID to integer
+        # Off the event loop: the store re-reads MongoDB when its version is due a check
+        product = await asyncio.to_thread(varieties.get, product_id)
+
+        if not product:
+            return jsonify({"error": "Product not found"}), 404
+
+        cache_control = f"public, max-age={current_app.config['PRODUCT_DETAILS_MAX_AGE']}"
+        description_key = _description_key(product)
+        cache_key = ('product_details', description_key, cache.version)
+        entry = response_cache.get(cache_key)
+        if entry is not None:
+            # Still a product-details cache hit as far as /metrics is concerned
+            cache.count_hit()
+        else:
+            # Served from cache when possible; concurrent misses share one generation
+            try:
+                product_data = await cache.get_or_create_async(description_key,
+                                                               lambda: _generate_product_details(product))
+            except Exception as e:  # GatewayError, or anything else the model raised
+                response = jsonify(_fallback_product_details(product, e))
+                response.headers['Cache-Control'] = 'no-store'
+                return response
+            body = current_app.json.dumps(product_data)
+            entry = response_cache.put(cache_key, body, make_etag('product_details', body),
+                                       ttl=current_app.config['PRODUCTS_CACHE_TTL'])
+        return cached_response(entry, cache_control)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/cart', methods=['POST'])
+
+@bp.route('/get_product_details/stream', methods=['GET'])
+def stream_product_details():
+    """Server-Sent Events variant of /get_product_details.
+
+    Sends a `product` event with the static fields straight away, then one
+    `chunk` event per piece of generated text and a final `done` event. A
+    cached description is sent whole in the `product` event.
+    """
+    product_id = request.args.get('id', type=int)
+    product = varieties.get(product_id)
+    if not product:
+        return jsonify({"error": "Product not found"}), 404
+
+    description_key = _description_key(product)
+    cached = cache.get(description_key)
+
+    def generate():
+        if cached is not None:
+            yield _sse('product', cached)
+            yield _sse('done', {})
+            return
+
+        product_data = _static_product_details(product)
+        yield _sse('product', product_data)
+        try:
+            chunks = []
+            for text in gemini.stream(_details_prompt(product)):
+                chunks.append(text)
+                yield _sse('chunk', {'text': text})
+            # Only a complete description is worth caching
+            product_data["detailed_info"] = ''.join(chunks)
+            cache.set(description_key, product_data)
+            yield _sse('done', {})
+        except GatewayError as e:
+            yield _sse('chunk', {'text': _fallback_product_details(product, e)['detailed_info']})
+            yield _sse('done', {'fallback': True})
+        except Exception as e:
+            logger.error("Streaming product details failed for product %s: %s", product_id, e)
+            yield _sse('error', {'error': str(e)})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Stop reverse proxies from buffering the stream
+    })
+
+
+@bp.cli.command('warm-descriptions')
+def warm_descriptions():
+    """Pre-generate AI descriptions for every product variety."""
+    pending = [product for product in varieties.list() if cache.get(_description_key(product)) is None]
+    # Runs at the gateway's concurrency and rate, queueing instead of failing fast
+    results = gemini.pre_generate([_details_prompt(product) for product in pending])
+    for product in pending:
+        text = results[_details_prompt(product)]
+        if isinstance(text, Exception):
+            logger.error("Failed to warm description for product %s: %s", product["id"], text)
+            continue
+        product_data = _static_product_details(product)
+        product_data["detailed_info"] = text
+        cache.set(_description_key(product), product_data)
+        logger.info("Warmed description cache for product %s", product["id"])
+
+
+@bp.route('/varieties', methods=['GET'])
+def list_varieties():
+    """Varieties, optionally filtered by ?type=Mango and/or searched with ?q=."""
+    return jsonify([
+        dict(_static_product_details(variety), type=variety['type'])
+        for variety in varieties.list(request.args.get('type'), request.args.get('q'))
+    ]), 200
+
+
+@bp.route('/varieties/types', methods=['GET'])
+def list_variety_types():
+    return jsonify(varieties.types()), 200
+
+
+@bp.cli.command('import-varieties')
+@click.argument('path')
+def import_varieties(path):
+    """Add or update varieties from a JSON list or a CSV file with a header row."""
+    inserted, updated, unchanged = varieties.import_varieties(load_records(path))
+    logger.info("Imported varieties from %s: %d new, %d updated, %d unchanged", path, inserted, updated, unchanged)
+
+def _is_positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 1
+
+
+def _cart_line_error(product_id, quantity):
+    """Why a cart line can't be stored, or None if it's valid."""
+    if not product_id or not ObjectId.is_valid(product_id):
+        return 'A valid product ID is required'
+    if not _is_positive_int(quantity):
+        return 'quantity must be a positive integer'
+    return None
+
+
+@bp.route('/cart', methods=['POST'])
+@login_required
 def add_to_cart():
     data = request.get_json()
-    user_id = data.get('user_id')
+    user_id = g.user_id
     product_id = data.get('product_id')
     quantity = data.get('quantity')
 
-    if not user_id or not product_id or quantity is None:
-        logger.error("Failed to add to cart: User ID, Product ID, and quantity are required")
-        return jsonify({'error': 'User ID, Product ID, and quantity are required'}), 400
+    if not product_id or quantity is None:
+        logger.error("Failed to add to cart: Product ID and quantity are required")
+        return jsonify({'error': 'Product ID and quantity are required'}), 400
+    error = _cart_line_error(product_id, quantity)
+    if error:
+        logger.error("Failed to add to cart: %s", error)
+        return jsonify({'error': error}), 400
+
+    # Adding a product already in the cart bumps its quantity instead of
+    # creating a duplicate row
+    mongo.db.cart.update_one(
+        {'user_id': ObjectId(user_id), 'product_id': ObjectId(product_id)},
+        {'$inc': {'quantity': quantity}},
+        upsert=True
+    )
+    logger.info("Item added to cart: user_id %s, product_id %s, quantity %s", user_id, product_id, quantity)
+    return jsonify({'message': 'Item added to cart'}), 201
 
-    cart_item = {
-        'user_id': ObjectId(user_id),
-        'product_id': ObjectId(product_id),
-        'quantity': quantity
-    }
 
-    db.cart.insert_one(cart_item)
-    logger.info("Item added to cart: %s", cart_item)
-    return jsonify({'message': 'Item added to cart'}), 201
+@bp.route('/cart/batch', methods=['POST'])
+@login_required
+def batch_update_cart():
+    """Apply a list of add/update/remove operations in one bulk write.
+
+    Body: {"operations": [{"op": "add"|"update"|"remove",
+    "product_id": ..., "quantity": n}, ...]}. Operations run in order;
+    "add" increments the quantity (creating the line if needed) and
+    "update" sets it. Responds with the resulting cart.
+    """
+    data = request.get_json()
+    user_id = g.user_id
+    operations = data.get('operations')
+
+    if not isinstance(operations, list) or not operations:
+        logger.error("Failed to batch update cart: A list of operations is required")
+        return jsonify({'error': 'A list of operations is required'}), 400
+    if len(operations) > MAX_CART_BATCH_SIZE:
+        return jsonify({'error': f'At most {MAX_CART_BATCH_SIZE} operations are allowed per batch'}), 400
+
+    user_oid = ObjectId(user_id)
+    writes = []
+    errors = {}
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            errors[index] = 'Each operation must be an object'
+            continue
+        op = operation.get('op')
+        product_id = operation.get('product_id')
+        if op not in ('add', 'update', 'remove'):
+            errors[index] = 'op must be add, update or remove'
+            continue
+        error = _cart_line_error(product_id, operation.get('quantity') if op != 'remove' else 1)
+        if error:
+            errors[index] = error
+            continue
+        quantity = operation.get('quantity')
+
+        line = {'user_id': user_oid, 'product_id': ObjectId(product_id)}
+        if op == 'add':
+            writes.append(UpdateOne(line, {'$inc': {'quantity': quantity}}, upsert=True))
+        elif op == 'update':
+            writes.append(UpdateOne(line, {'$set': {'quantity': quantity}}, upsert=True))
+        else:
+            writes.append(DeleteMany(line))
+
+    if errors:
+        logger.error("Failed to batch update cart for user_id %s: %s", user_id, errors)
+        return jsonify({'error': 'Invalid operations', 'errors': errors}), 400
 
-@app.route('/cart', methods=['PUT'])
+    result = mongo.db.cart.bulk_write(writes, ordered=True)
+    logger.info(
+        "Batch updated cart for user_id %s: %d ops, %d upserted, %d modified, %d deleted",
+        user_id, len(writes), result.upserted_count, result.modified_count, result.deleted_count
+    )
+
+    cart_items = list(mongo.db.cart.find({'user_id': user_oid}))
+    return jsonify(_cart_items_with_products(user_id, cart_items)), 200
+
+@bp.route('/cart', methods=['PUT'])
+@login_required
 def update_cart():
     data = request.get_json()
-    user_id = data.get('user_id')
+    user_id = g.user_id
     product_id = data.get('product_id')
     quantity = data.get('quantity')
 
-    if not user_id or not product_id or quantity is None:
-        logger.error("Failed to update cart: User ID, Product ID, and quantity are required")
-        return jsonify({'error': 'User ID, Product ID, and quantity are required'}), 400
+    if not product_id or quantity is None:
+        logger.error("Failed to update cart: Product ID and quantity are required")
+        return jsonify({'error': 'Product ID and quantity are required'}), 400
+    error = _cart_line_error(product_id, quantity)
+    if error:
+        logger.error("Failed to update cart: %s", error)
+        return jsonify({'error': error}), 400
 
-    result = db.cart.update_one(
+    result = mongo.db.cart.update_one(
         {'user_id': ObjectId(user_id), 'product_id': ObjectId(product_id)},
         {'$set': {'quantity': quantity}}
     )
@@ -348,17 +815,22 @@ def update_cart():
     logger.info("Cart item updated: user_id %s, product_id %s, quantity %s", user_id, product_id, quantity)
     return jsonify({'message': 'Cart item updated'}), 200
 
-@app.route('/cart', methods=['DELETE'])
+@bp.route('/cart', methods=['DELETE'])
+@login_required
 def remove_from_cart():
     data = request.get_json()
-    user_id = data.get('user_id')
+    user_id = g.user_id
     product_id = data.get('product_id')
 
-    if not user_id or not product_id:
-        logger.error("Failed to remove from cart: User ID and Product ID are required")
-        return jsonify({'error': 'User ID and Product ID are required'}), 400
+    if not product_id:
+        logger.error("Failed to remove from cart: Product ID is required")
+        return jsonify({'error': 'Product ID is required'}), 400
+    error = _cart_line_error(product_id, 1)  # No quantity to check on a removal
+    if error:
+        logger.error("Failed to remove from cart: %s", error)
+        return jsonify({'error': error}), 400
 
-    result = db.cart.delete_one({'user_id': ObjectId(user_id), 'product_id': ObjectId(product_id)})
+    result = mongo.db.cart.delete_one({'user_id': ObjectId(user_id), 'product_id': ObjectId(product_id)})
 
     if result.deleted_count == 0:
         logger.error("Failed to remove from cart: Cart item not found for user_id %s and product_id %s", user_id, product_id)
@@ -367,16 +839,12 @@ def remove_from_cart():
     logger.info("Cart item removed: user_id %s, product_id %s", user_id, product_id)
     return jsonify({'message': 'Cart item removed'}), 200
 
-@app.route('/cart/clear', methods=['DELETE'])
+@bp.route('/cart/clear', methods=['DELETE'])
+@login_required
 def clear_cart():
-    data = request.get_json()
-    user_id = data.get('user_id')
-
-    if not user_id:
-        logger.error("Failed to clear cart: User ID is required")
-        return jsonify({'error': 'User ID is required'}), 400
+    user_id = g.user_id
 
-    result = db.cart.delete_many({'user_id': ObjectId(user_id)})
+    result = mongo.db.cart.delete_many({'user_id': ObjectId(user_id)})
 
     if result.deleted_count == 0:
         logger.error("Failed to clear cart: No items found in cart for user_id %s", user_id)
@@ -384,120 +852,508 @@ def clear_cart():
 
     logger.info("Cart cleared for user_id %s", user_id)
     return jsonify({'message': 'Cart cleared'}), 200
-@app.route('/bookings', methods=['POST'])
-def pre_book_now():
+@bp.route('/bookings', methods=['POST'])
+@login_required
+async def pre_book_now():
     data = request.get_json()
-    logger.info("Received booking data: %s", data)  # Log the received data
 
-    user_id = data.get('user_id')
-    product_name = data.get('product_name')
+    user_id = g.user_id
     product_id = data.get('product_id')
     quantity = data.get('quantity')
-    krishiBhavan = data.get('krishiBhavan')
     booking_date_time = data.get('booking_date_time')
-    total_amount = data.get('total_amount')
-    collection_status = data.get('collection_status', 'pending')
 
     missing_fields = {}
-    if not user_id:
-        missing_fields['user_id'] = user_id
-    if not product_name:
-        missing_fields['product_name'] = product_name
     if not product_id:
         missing_fields['product_id'] = product_id
     if quantity is None:
         missing_fields['quantity'] = quantity
-    if not krishiBhavan:
-        missing_fields['krishiBhavan'] = krishiBhavan
     if not booking_date_time:
         missing_fields['booking_date_time'] = booking_date_time
-    if total_amount is None:
-        missing_fields['total_amount'] = total_amount
 
     if missing_fields:
         logger.error("Failed to pre-book: All fields are required. Missing fields: %s", missing_fields)
         return jsonify({'error': 'All fields are required', 'missing_fields': missing_fields}), 400
 
-    booking = {
+    if not _is_positive_int(quantity):
+        return jsonify({'error': 'quantity must be a positive integer'}), 400
+
+    # Store a typed date so bookings can be filtered server-side
+    try:
+        booking_date_time = parse_datetime(booking_date_time)
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({'error': 'booking_date_time must be an ISO-8601 date'}), 400
+
+    # Name, office and amount come from the product that was reserved, never
+    # from the client (the seller revenue rollups sum total_amount)
+    def make_booking(product, quantity):
+        return _make_booking(user_id, product, quantity, booking_date_time)
+
+    # Decrement stock and insert the booking together so popular items can't oversell
+    try:
+        booking, = await book_items_async(mongo.async_client, mongo.async_db, [(to_object_id(product_id), quantity)],
+                                          make_booking, use_transactions=mongo.config.get('MONGO_TRANSACTIONS'))
+    except ReservationError as e:
+        return _reservation_error_response(e)
+    await catalogue_version.bump_async()  # Listed stock changed
+
+    logger.info("Pre-booking successful", extra={'fields': {
+        'booking_id': str(booking['_id']), 'user_id': user_id, 'product_id': product_id, 'quantity': quantity
+    }})
+    return jsonify({'message': 'Pre-booking successful', 'id': str(booking['_id'])}), 201
+
+
+def _make_booking(user_id, product, quantity, booking_date_time):
+    """A new booking for `quantity` units of the product reserve_stock returned."""
+    return {
         'user_id': user_id,
-        'product_name': product_name,
-        'product_id': product_id,
+        'product_name': product['name'],
+        'product_id': str(product['_id']),
         'quantity': quantity,
-        'krishiBhavan': krishiBhavan,
+        'krishiBhavan': product.get('krishiBhavan', ''),
         'booking_date_time': booking_date_time,
-        'total_amount': total_amount,
-        'collection_status': collection_status
+        'total_amount': float(product.get('price_registered', 0)) * quantity,
+        # New bookings always start pending; later changes go through
+        # STATUS_TRANSITIONS (see /seller/bookings/status)
+        'collection_status': 'pending',
+        'stock_reserved': True
     }
 
-    db.bookings.insert_one(booking)
-    logger.info("Pre-booking successful: %s", booking)
-    return jsonify({'message': 'Pre-booking successful', 'id': str(booking['_id'])}), 201
-
-@app.route('/cart', methods=['GET'])
-def get_cart_items():
-    user_id = request.args.get('user_id')
-    if not user_id:
-        logger.error("Failed to fetch cart items: User ID is required")
-        return jsonify({'error': 'User ID is required'}), 400
 
-    cart_items = list(db.cart.find({'user_id': ObjectId(user_id)}))
+def _reservation_error_response(error):
+    logger.error("Failed to pre-book: %s", error)
+    if isinstance(error, OutOfStock):
+        status = 409
+    elif isinstance(error, InvalidQuantity):
+        status = 400
+    else:
+        status = 404
+    return jsonify({'error': str(error), 'product_ids': error.product_ids}), status
+
+
+@bp.route('/bookings/checkout', methods=['POST'])
+@login_required
+async def checkout_cart():
+    """Book every line of the user's cart at once.
+
+    Either all lines are booked (and removed from the cart) or none are, in
+    which case the response lists the products that could not be reserved.
+    """
+    user_id = g.user_id
+    user_oid = ObjectId(user_id)
+    cart_items = await mongo.async_db.cart.find({'user_id': user_oid}).to_list(None)
     if not cart_items:
-        logger.error("No items found in cart for user_id %s", user_id)
         return jsonify({'error': 'No items found in cart for this user'}), 404
+    invalid = [str(item['product_id']) for item in cart_items if not _is_positive_int(item.get('quantity'))]
+    if invalid:
+        logger.error("Failed to check out cart for user_id %s: invalid quantities for %s", user_id, invalid)
+        return jsonify({'error': 'Cart lines must have a positive integer quantity', 'product_ids': invalid}), 400
 
-    cart_items_list = [
-        {
+    # Merge duplicate lines for the same product
+    quantities = {}
+    for item in cart_items:
+        quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+
+    booking_date_time = datetime.now(timezone.utc)
+
+    def make_booking(product, quantity):
+        return _make_booking(user_id, product, quantity, booking_date_time)
+
+    try:
+        bookings = await book_items_async(mongo.async_client, mongo.async_db, list(quantities.items()), make_booking,
+                                          use_transactions=mongo.config.get('MONGO_TRANSACTIONS'))
+    except ReservationError as e:
+        return _reservation_error_response(e)
+    await catalogue_version.bump_async()  # Listed stock changed
+
+    await mongo.async_db.cart.delete_many({'user_id': user_oid, 'product_id': {'$in': list(quantities)}})
+    logger.info("Checked out %d cart lines for user_id %s", len(bookings), user_id)
+    return jsonify({
+        'message': 'Pre-booking successful',
+        'ids': [str(booking['_id']) for booking in bookings],
+        'total_amount': sum(booking['total_amount'] for booking in bookings)
+    }), 201
+
+def _cart_items_with_products(user_id, cart_items):
+    # Resolve every product in the cart with a single $in query instead of
+    # one find_one per field per line.
+    product_ids = list({item['product_id'] for item in cart_items})
+    products_by_id = {
+        product['_id']: product
+        for product in mongo.db.products.find({'_id': {'$in': product_ids}}, CART_PRODUCT_PROJECTION)
+    }
+
+    cart_items_list = []
+    for item in cart_items:
+        product = products_by_id.get(item['product_id'])
+        if not product:
+            logger.warning("Skipping cart item for user_id %s: product %s no longer exists", user_id, item['product_id'])
+            continue
+        cart_items_list.append({
             'product_id': str(item['product_id']),
-            'product_name': db.products.find_one({'_id': item['product_id']})['name'],
-            'product_price': db.products.find_one({'_id': item['product_id']})['price_registered'],
-            'product_imageUrl': db.products.find_one({'_id': item['product_id']})['imageUrl'],
-            'product_description': db.products.find_one({'_id': item['product_id']})['description'],
-            'product_stock': db.products.find_one({'_id': item['product_id']})['stock'],
+            'product_name': product.get('name', ''),
+            'product_price': product.get('price_registered', 0),
+            'product_imageUrl': product.get('imageUrl', ''),
+            'product_description': product.get('description', ''),
+            'product_stock': product.get('stock', 0),
             'quantity': item['quantity'],
-            'krishiBhavan': db.products.find_one({'_id': item['product_id']})['krishiBhavan']
-        }
-        for item in cart_items
-    ]
+            'krishiBhavan': product.get('krishiBhavan', '')
+        })
+    return cart_items_list
+
 
-    logger.info("Fetched cart items for user_id %s: %s", user_id, cart_items_list)
+@bp.route('/cart', methods=['GET'])
+@login_required
+def get_cart_items():
+    user_id = g.user_id
+    cart_items = list(mongo.db.cart.find({'user_id': ObjectId(user_id)}))
+    if not cart_items:
+        logger.error("No items found in cart for user_id %s", user_id)
+        return jsonify({'error': 'No items found in cart for this user'}), 404
+
+    cart_items_list = _cart_items_with_products(user_id, cart_items)
+
+    logger.info("Fetched cart items", extra={'fields': {'user_id': user_id, 'count': len(cart_items_list)}})
     return jsonify(cart_items_list), 200
 
-@app.route('/bookings', methods=['GET'])
-def get_user_bookings():
-    user_id = request.args.get('user_id')
-    if not user_id:
-        logger.error("Failed to fetch bookings: User ID is required")
-        return jsonify({'error': 'User ID is required'}), 400
-
-    # try:
-    #     user_id = ObjectId(user_id)
-    # except Exception as e:
-    #     logger.error("Invalid user ID format: %s", e)
-    #     return jsonify({'error': 'Invalid user ID format'}), 400
-
-    logger.info("Fetching bookings for user_id: %s", user_id)
-    bookings = list(db.bookings.find({'user_id': user_id}))
+def _isoformat(value):
+    # Dates come back from MongoDB as naive UTC; unmigrated rows are still strings
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=timezone.utc).isoformat() if value.tzinfo is None else value.isoformat()
+    return value
+
+
+def _serialize_booking(booking):
+    return {
+        'id': str(booking['_id']),
+        'user_id': booking['user_id'],
+        'product_name': booking['product_name'],
+        'product_id': booking['product_id'],
+        'quantity': booking['quantity'],
+        'krishiBhavan': booking['krishiBhavan'],
+        'booking_date_time': _isoformat(booking['booking_date_time']),
+        'total_amount': booking['total_amount'],
+        'collection_status': booking['collection_status']
+    }
+
+
+@bp.route('/bookings', methods=['GET'])
+@login_required
+async def get_user_bookings():
+    user_id = g.user_id
+    bookings = await mongo.async_secondary_db.bookings.find({'user_id': user_id}).to_list(None)
     if not bookings:
         logger.error("No bookings found for user_id %s", user_id)
         return jsonify({'error': 'No bookings found for this user'}), 404
 
-    bookings_list = [
+    bookings_list = [_serialize_booking(booking) for booking in bookings]
+
+    logger.info("Fetched bookings", extra={'fields': {'user_id': user_id, 'count': len(bookings_list)}})
+    return jsonify(bookings_list), 200
+
+# =========================== SELLER DASHBOARD =========================== #
+
+def _seller_day_start(value, days=0):
+    """When the YYYY-MM-DD day `value` (plus `days`) starts in SELLER_TIMEZONE, in UTC."""
+    day = date.fromisoformat(value) + timedelta(days=days)
+    seller_timezone = ZoneInfo(current_app.config['SELLER_TIMEZONE'])
+    return datetime.combine(day, datetime.min.time(), tzinfo=seller_timezone).astimezone(timezone.utc)
+
+
+def _seller_office():
+    """The Krishi Bhavan signed into the seller's token, or (None, error_response)."""
+    office = g.get('user_krishi_bhavan')
+    if not office:
+        return None, (jsonify({'error': 'No Krishi Bhavan is assigned to this seller account'}), 403)
+    return office, None
+
+
+def _seller_bookings_match(args):
+    """Build the $match stage shared by the seller bookings routes.
+
+    `args` is a MultiDict of filters. Returns (match, error_response).
+    Sellers only ever see their own Krishi Bhavan: krishiBhavan defaults to
+    it and any other office is refused. Every query therefore starts with
+    krishiBhavan and is served by the (krishiBhavan, ...) indexes.
+    """
+    office, error = _seller_office()
+    if error:
+        return None, error
+    krishiBhavan = args.get('krishiBhavan') or office
+    if krishiBhavan != office:
+        return None, (jsonify({'error': 'Sellers can only manage bookings of their own Krishi Bhavan'}), 403)
+
+    match = {'krishiBhavan': krishiBhavan}
+    statuses = args.getlist('collection_status')
+    if statuses:
+        match['collection_status'] = statuses[0] if len(statuses) == 1 else {'$in': statuses}
+
+    try:
+        date_from = args.get('from')
+        date_to = args.get('to')
+        if date_from or date_to:
+            match['booking_date_time'] = {}
+        # A bare date means that whole day in SELLER_TIMEZONE, the same days
+        # the summary groups by
+        if date_from:
+            match['booking_date_time']['$gte'] = (_seller_day_start(date_from) if len(date_from) == 10
+                                                  else parse_datetime(date_from))
+        if date_to:
+            if len(date_to) == 10:
+                match['booking_date_time']['$lt'] = _seller_day_start(date_to, days=1)
+            else:
+                match['booking_date_time']['$lte'] = parse_datetime(date_to)
+    except (ValueError, TypeError, AttributeError):
+        return None, (jsonify({'error': 'from and to must be ISO-8601 dates'}), 400)
+
+    return match, None
+
+
+@bp.route('/seller/bookings', methods=['GET'])
+@login_required
+@role_required('seller')
+def get_seller_bookings():
+    """Paginated bookings for the seller's Krishi Bhavan, newest first.
+
+    Filters: collection_status (repeatable), from, to. Pass limit for
+    keyset pagination; the next page's cursor is returned in the
+    X-Next-Cursor header.
+    """
+    match, error = _seller_bookings_match(request.args)
+    if error:
+        return error
+
+    try:
+        limit = _number_arg('limit', int)
+        if limit is None:
+            limit = DEFAULT_SELLER_PAGE_SIZE
+        if not 1 <= limit <= MAX_SELLER_PAGE_SIZE:
+            raise ValueError(limit)
+    except ValueError:
+        return jsonify({'error': f'limit must be an integer between 1 and {MAX_SELLER_PAGE_SIZE}'}), 400
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            last_value, last_id = _decode_cursor(cursor, SELLER_BOOKINGS_SORT)
+            last_value = parse_datetime(last_value)
+        except (ValueError, KeyError, TypeError, AttributeError, InvalidId):
+            return jsonify({'error': 'Invalid pagination cursor'}), 400
+        match = {'$and': [match, {'$or': [
+            {'booking_date_time': {'$lt': last_value}},
+            {'booking_date_time': last_value, '_id': {'$lt': last_id}}
+        ]}]}
+
+    bookings = list(mongo.secondary_db.bookings.aggregate([
+        {'$match': match},
+        {'$sort': {'booking_date_time': DESCENDING, '_id': DESCENDING}},
+        {'$limit': limit + 1}  # One extra to know whether another page exists
+    ]))
+
+    response = jsonify([_serialize_booking(booking) for booking in bookings[:limit]])
+    if len(bookings) > limit:
+        last = bookings[limit - 1]
+        response.headers['X-Next-Cursor'] = _encode_cursor(SELLER_BOOKINGS_SORT, _isoformat(last['booking_date_time']),
+                                                           last['_id'])
+    return response, 200
+
+
+@bp.route('/seller/bookings/summary', methods=['GET'])
+@login_required
+@role_required('seller')
+def get_seller_bookings_summary():
+    """Bookings, quantity and revenue per product per day for the seller's Krishi Bhavan.
+
+    Accepts the same filters as /seller/bookings. Days are bucketed in
+    SELLER_TIMEZONE.
+    """
+    match, error = _seller_bookings_match(request.args)
+    if error:
+        return error
+
+    day = {'$dateToString': {'format': '%Y-%m-%d', 'date': '$booking_date_time',
+                             'timezone': current_app.config['SELLER_TIMEZONE']}}
+    rows = mongo.secondary_db.bookings.aggregate([
+        {'$match': match},
+        {'$group': {
+            '_id': {'product_id': '$product_id', 'day': day},
+            'product_name': {'$first': '$product_name'},
+            'bookings': {'$sum': 1},
+            'quantity': {'$sum': '$quantity'},
+            'revenue': {'$sum': '$total_amount'}
+        }},
+        {'$sort': {'_id.day': DESCENDING, 'product_name': ASCENDING}}
+    ])
+
+    summary = [
         {
-            'id': str(booking['_id']),
-            'user_id': booking['user_id'],
-            'product_name': booking['product_name'],
-            'product_id': booking['product_id'],
-            'quantity': booking['quantity'],
-            'krishiBhavan': booking['krishiBhavan'],
-            'booking_date_time': booking['booking_date_time'],
-            'total_amount': booking['total_amount'],
-            'collection_status': booking['collection_status']
+            'date': row['_id']['day'],
+            'product_id': row['_id']['product_id'],
+            'product_name': row['product_name'],
+            'bookings': row['bookings'],
+            'quantity': row['quantity'],
+            'revenue': row['revenue']
         }
-        for booking in bookings
+        for row in rows
     ]
+    return jsonify(summary), 200
+
+
+@bp.route('/seller/bookings/status', methods=['POST'])
+@login_required
+@role_required('seller')
+def update_bookings_status():
+    """Move many bookings to a new collection_status in one call.
+
+    Body: {"status": "collected", "ids": [...]} or {"status": ...,
+    "filter": {"collection_status": ..., "from": ..., "to": ...}}. Only the
+    seller's own Krishi Bhavan's bookings are touched. Invalid transitions
+    are reported per booking rather than failing the batch; cancelled and
+    expired bookings return their stock.
+    """
+    data = request.get_json()
+    to_status = data.get('status')
+    ids = data.get('ids')
+    booking_filter = data.get('filter')
+
+    if to_status not in STATUS_TRANSITIONS:
+        return jsonify({'error': f"status must be one of {', '.join(STATUS_TRANSITIONS)}"}), 400
+    if (ids is None) == (booking_filter is None):
+        return jsonify({'error': 'Provide either a list of ids or a filter'}), 400
+
+    office, error = _seller_office()
+    if error:
+        return error
+
+    results = {}
+    projection = {'collection_status': 1}
+    if ids is not None:
+        if (not isinstance(ids, list) or len(ids) > MAX_STATUS_BATCH_SIZE
+                or not all(isinstance(booking_id, str) for booking_id in ids)):
+            return jsonify({'error': f'ids must be a list of at most {MAX_STATUS_BATCH_SIZE} booking ID strings'}), 400
+        # Results are keyed (and reported) by the normalised id, so "ABC..."
+        # and "abc..." are the same booking
+        order = []
+        valid_ids = []
+        for booking_id in ids:
+            if ObjectId.is_valid(booking_id):
+                valid_ids.append(ObjectId(booking_id))
+                order.append(str(valid_ids[-1]))
+            else:
+                results[booking_id] = 'invalid_id'
+                order.append(booking_id)
+        # Another office's bookings are reported as not found
+        bookings = list(mongo.db.bookings.find({'_id': {'$in': valid_ids}, 'krishiBhavan': office}, projection))
+        found = {booking['_id'] for booking in bookings}
+        results.update({str(booking_id): 'not_found' for booking_id in valid_ids if booking_id not in found})
+    else:
+        if not isinstance(booking_filter, dict):
+            return jsonify({'error': 'filter must be an object'}), 400
+        match, error = _seller_bookings_match(MultiDict(booking_filter))
+        if error:
+            return error
+        bookings = list(mongo.db.bookings.find(match, projection).limit(MAX_STATUS_BATCH_SIZE))
+        order = None
+
+    transitioned = transition_bookings(mongo.client, mongo.db, bookings, to_status,
+                                       use_transactions=mongo.config.get('MONGO_TRANSACTIONS'))
+    results.update({str(booking_id): result for booking_id, result in transitioned.items()})
+
+    updated = sum(1 for result in results.values() if result == 'updated')
+    if updated and to_status in RELEASES_STOCK:
+        catalogue_version.bump()  # Listed stock changed
+    logger.info("Moved %d of %d bookings to %s", updated, len(results), to_status)
+    # Report in request order when ids were given
+    order = dict.fromkeys(order) if order is not None else results
+    return jsonify({
+        'updated': updated,
+        'results': [{'id': booking_id, 'result': results[booking_id]} for booking_id in order]
+    }), 200
+
+
+@bp.cli.command('migrate-bookings')
+def migrate_bookings():
+    """Convert string booking dates and amounts to typed values."""
+    converted, skipped = migrate_booking_types(mongo.db)
+    logger.info("Migrated %d bookings, skipped %d", converted, skipped)
+
+
+@bp.cli.command('ensure-indexes')
+@click.option('--explain', is_flag=True, help='Then print the query plan for every hot route query.')
+def ensure_indexes_command(explain):
+    """Create the declared MongoDB indexes (see indexes.py)."""
+    ensure_indexes(mongo.db)
+    if explain:
+        explain_route_queries(mongo.db)
+
+
+@bp.cli.command('migrate-cart')
+def migrate_cart():
+    """Merge duplicate cart lines and build the unique cart index."""
+    removed = merge_duplicate_cart_lines(mongo.db)
+    ensure_indexes(mongo.db)
+    logger.info("Merged duplicate cart lines, removed %d rows", removed)
+
+# ============================ APP FACTORY ============================ #
+
+def create_app(config=None):
+    """Build the Flask app.
+
+    `config` is an environment name ('production'), a config class, a dict
+    of overrides, or None to use APP_ENV (see config.py). No database connection is made
+    here; the MongoDB client is created on first use in each process.
+    Every call builds its own services, so two apps never share state.
+    """
+    # Async views (details and bookings) run on one event loop per process, see aio.py
+    app = AsyncApp(__name__)
+    app.config.from_object(get_config(config if isinstance(config, str) else None))
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None and not isinstance(config, str):
+        app.config.from_object(config)
+
+    configure_logging(app.config)
+    init_auth(app)
+    init_passwords(app)
+    init_request_logging(app)
+    _init_services(app)
+    init_metrics(app, app.extensions['mongo'])
+    CORS(app, resources={r"/*": {"origins": app.config['CORS_ORIGINS']}}, expose_headers=["X-Next-Cursor", "X-Request-ID", "X-DB-Calls", "X-DB-Time-ms", "ETag"])
+    app.register_blueprint(bp)
+    return app
+
+
+def provision_indexes(app):
+    """Create the declared indexes before serving, if MONGO_ENSURE_INDEXES is set.
+
+    Called once by the server entry points, never on a request. The client
+    used is closed again so forked workers each connect for themselves.
+    """
+    if not app.config['MONGO_ENSURE_INDEXES']:
+        return
+    db = app.extensions['mongo']
+    ensure_indexes(db.db)
+    db.close()
+
+
+def _init_services(app):
+    """Build this app's MongoDB client, caches, snapshot and Gemini gateway."""
+    config = app.config
+    db = Mongo(app)  # registers itself as app.extensions['mongo']
+    version = CatalogueVersion(lambda: db.db.counters, ttl=config['CATALOGUE_VERSION_TTL'],
+                               get_async_collection=lambda: db.async_db.counters)
+    app.extensions.update({
+        'catalogue_version': version,
+        'response_cache': ResponseCache(config['HTTP_CACHE_SIZE']),
+        'catalogue': CatalogueSnapshot(lambda: db.secondary_db.products, version.get, PRODUCT_LIST_PROJECTION,
+                                       mode=config['CATALOGUE_SNAPSHOT']),
+        'description_cache': create_description_cache(lambda: db.db, version_key(PRODUCT_DETAILS_PROMPT), config,
+                                                      get_async_db=lambda: db.async_db),
+        'varieties': VarietyStore(lambda: db.db.varieties, CatalogueVersion(
+            lambda: db.db.counters, ttl=config['CATALOGUE_VERSION_TTL'], name='varieties')),
+        'gemini': _create_gemini(config),
+    })
 
-    logger.info("Fetched bookings for user_id %s: %s", user_id, bookings_list)
-    return jsonify(bookings_list), 200
 
 if __name__ == '__main__':
+    app = create_app()
+    provision_indexes(app)
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""Signed, stateless access tokens.
+
+/login and /register issue a token signed with SECRET_KEY using
+itsdangerous, which ships with Flask. Routes decorated with
+@login_required read the token from the `Authorization: Bearer <token>`
+header and expose the caller as g.user_id, g.user_role and, for sellers,
+g.user_krishi_bhavan (the office they work for), with no database lookup. Tokens that verified recently are remembered for
+TOKEN_CACHE_TTL seconds, so repeat requests skip the HMAC check too.
+
+Seller-only routes also carry @role_required('seller'), checked against
+the role signed into the token. Role and office changes (`flask --app app
+set-role`) apply from the user's next login.
+
+Clients may still send user_id (or userId) in the query string or body.
+It is no longer trusted: if present it must match the token, otherwise
+the request gets a 403.
+
+Settings (app config / environment):
+    SECRET_KEY         signing key; required in production
+    ACCESS_TOKEN_TTL   token lifetime in seconds (default 12 hours)
+    TOKEN_CACHE_TTL    seconds a verified token is remembered (default 60)
+    TOKEN_CACHE_SIZE   verified tokens remembered per worker (default 10000)
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+TOKEN_SALT = 'access-token'
+
+
+class VerificationCache:
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # token -> (expires_at, identity)
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[1]
+
+    def set(self, token, identity, ttl):
+        with self._lock:
+            self._entries[token] = (time.monotonic() + ttl, identity)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=TOKEN_SALT)
+
+
+def issue_token(user_id, role, krishi_bhavan=None):
+    """A signed access token for the user, as returned by /login and /register."""
+    payload = {'uid': str(user_id), 'role': role}
+    if krishi_bhavan:
+        payload['kb'] = krishi_bhavan
+    return _serializer().dumps(payload)
+
+
+def verify_token(token):
+    """Return (user_id, role, krishi_bhavan) for a valid token.
+
+    Raises BadSignature/SignatureExpired otherwise.
+    """
+    verified = current_app.extensions['verified_tokens']
+    identity = verified.get(token)
+    if identity is not None:
+        return identity
+    max_age = current_app.config['ACCESS_TOKEN_TTL']
+    payload, issued_at = _serializer().loads(token, max_age=max_age, return_timestamp=True)
+    identity = (payload['uid'], payload.get('role'), payload.get('kb'))
+    # Never remember a token past its own expiry
+    remaining = issued_at.timestamp() + max_age - time.time()
+    ttl = min(current_app.config['TOKEN_CACHE_TTL'], remaining)
+    if ttl > 0:
+        verified.set(token, identity, ttl)
+    return identity
+
+
+def _unauthorized(message):
+    response = jsonify({'error': message})
+    response.status_code = 401
+    response.headers['WWW-Authenticate'] = 'Bearer'
+    return response
+
+
+def login_required(view):
+    """Require a valid access token and set g.user_id / g.user_role / g.user_krishi_bhavan from it."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not token.strip():
+            return _unauthorized('Authentication required')
+        try:
+            g.user_id, g.user_role, g.user_krishi_bhavan = verify_token(token.strip())
+        except SignatureExpired:
+            return _unauthorized('Access token has expired')
+        except (BadSignature, KeyError, TypeError):
+            return _unauthorized('Invalid access token')
+
+        body = request.get_json() if request.is_json else None
+        claimed = request.args.get('user_id')
+        if isinstance(body, dict):
+            claimed = claimed or body.get('user_id') or body.get('userId')
+        if claimed and str(claimed) != g.user_id:
+            return jsonify({'error': 'user_id does not match the signed-in user'}), 403
+        # ensure_sync runs an async view on the app's event loop (see aio.py)
+        return current_app.ensure_sync(view)(*args, **kwargs)
+    return wrapper
+
+
+def role_required(role):
+    """Only let callers whose token carries `role` through; use below @login_required."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if g.get('user_role') != role:
+                return jsonify({'error': f'Only {role}s can do this'}), 403
+            return current_app.ensure_sync(view)(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def init_auth(app):
+    if not app.config.get('SECRET_KEY'):
+        raise RuntimeError('SECRET_KEY must be set to sign access tokens')
+    # Per app: a token is only ever trusted by the app whose key signed it
+    app.extensions['verified_tokens'] = VerificationCache(app.config['TOKEN_CACHE_SIZE'])
@@ -0,0 +1,77 @@
+"""Concurrency stress test for stock reservation on POST /bookings.
+
+Fires many parallel bookings at one product with limited stock and checks
+that it never oversells: booked units + remaining stock must equal the
+starting stock, and stock must never go negative.
+
+    MONGO_URI=mongodb://localhost:27017 python bench_bookings.py --stock 100 --bookings 500 --clients 50
+"""
+import argparse
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import ObjectId
+
+from app import create_app, mongo
+from auth import issue_token
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--stock', type=int, default=100)
+    parser.add_argument('--bookings', type=int, default=500)
+    parser.add_argument('--quantity', type=int, default=1, help='units per booking')
+    parser.add_argument('--clients', type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db = mongo.db
+    product_id = db.products.insert_one({
+        'name': 'Stress sapling', 'description': '', 'price_registered': 50.0, 'price_unregistered': 60.0,
+        'stock': args.stock, 'category': 'Saplings', 'krishiBhavan': 'Krishi Bhavan 1', 'imageUrl': ''
+    }).inserted_id
+    user_id = str(ObjectId())
+    with app.app_context():
+        headers = {'Authorization': f"Bearer {issue_token(user_id, 'customer')}"}
+    local = threading.local()
+
+    def book(_):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        response = local.client.post('/bookings', json={
+            'user_id': user_id,
+            'product_name': 'Stress sapling',
+            'product_id': str(product_id),
+            'quantity': args.quantity,
+            'krishiBhavan': 'Krishi Bhavan 1',
+            'booking_date_time': '2025-01-01T00:00:00Z',
+            'total_amount': 50.0 * args.quantity
+        }, headers=headers)
+        return response.status_code
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            statuses = Counter(pool.map(book, range(args.bookings)))
+        elapsed = time.perf_counter() - start
+
+        remaining = db.products.find_one({'_id': product_id})['stock']
+        booked_units = sum(b['quantity'] for b in db.bookings.find({'user_id': user_id}, {'quantity': 1}))
+    finally:
+        db.products.delete_one({'_id': product_id})
+        db.bookings.delete_many({'user_id': user_id})
+
+    print(f"{args.bookings} bookings in {elapsed:.2f}s ({args.bookings / elapsed:.1f} req/s)")
+    print(f"responses: {dict(statuses)}")
+    print(f"starting stock {args.stock}, booked {booked_units}, remaining {remaining}")
+    ok = remaining >= 0 and booked_units + remaining == args.stock and statuses[201] * args.quantity == booked_units
+    print("no oversell" if ok else "OVERSOLD")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
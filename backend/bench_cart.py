@@ -0,0 +1,107 @@
+"""Count MongoDB round trips made by GET /cart before and after batching.
+
+Seeds a throwaway cart in the database pointed to by MONGO_URI, then compares
+the old per-field find_one pattern with the current route.
+
+    MONGO_URI=mongodb://localhost:27017 python bench_cart.py --lines 30
+"""
+import argparse
+import time
+
+from bson import ObjectId
+from pymongo import monitoring
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+counter = CommandCounter()
+monitoring.register(counter)
+
+# The app's client is created lazily, after the listener is registered
+from app import create_app, mongo  # noqa: E402
+from auth import issue_token  # noqa: E402
+
+app = create_app()
+with app.app_context():
+    db = mongo.db
+
+
+def legacy_cart_lookup(user_id):
+    """The pre-batching GET /cart body: six find_one calls per cart line."""
+    cart_items = list(db.cart.find({'user_id': user_id}))
+    return [
+        {
+            'product_name': db.products.find_one({'_id': item['product_id']})['name'],
+            'product_price': db.products.find_one({'_id': item['product_id']})['price_registered'],
+            'product_imageUrl': db.products.find_one({'_id': item['product_id']})['imageUrl'],
+            'product_description': db.products.find_one({'_id': item['product_id']})['description'],
+            'product_stock': db.products.find_one({'_id': item['product_id']})['stock'],
+            'krishiBhavan': db.products.find_one({'_id': item['product_id']})['krishiBhavan']
+        }
+        for item in cart_items
+    ]
+
+
+def measure(fn, repeat):
+    counter.count = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = time.perf_counter() - start
+    return counter.count / repeat, elapsed / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=30, help='cart lines to seed')
+    parser.add_argument('--repeat', type=int, default=20, help='requests per measurement')
+    args = parser.parse_args()
+
+    user_id = ObjectId()
+    product_ids = db.products.insert_many([
+        {
+            'name': f'Bench product {i}',
+            'description': 'benchmark fixture',
+            'price_registered': 10.0,
+            'price_unregistered': 12.0,
+            'stock': 100,
+            'category': 'Seeds',
+            'krishiBhavan': 'Krishi Bhavan 1',
+            'imageUrl': ''
+        }
+        for i in range(args.lines)
+    ]).inserted_ids
+    db.cart.insert_many([
+        {'user_id': user_id, 'product_id': product_id, 'quantity': 1}
+        for product_id in product_ids
+    ])
+
+    try:
+        client = app.test_client()
+        with app.app_context():
+            headers = {'Authorization': f"Bearer {issue_token(user_id, 'customer')}"}
+        before = measure(lambda: legacy_cart_lookup(user_id), args.repeat)
+        after = measure(lambda: client.get('/cart', headers=headers), args.repeat)
+    finally:
+        db.cart.delete_many({'user_id': user_id})
+        db.products.delete_many({'_id': {'$in': product_ids}})
+
+    print(f"cart lines: {args.lines}")
+    print(f"before: {before[0]:.0f} round trips/request, {before[1]:.2f} ms/request")
+    print(f"after:  {after[0]:.0f} round trips/request, {after[1]:.2f} ms/request")
+
+
+if __name__ == '__main__':
+    main()
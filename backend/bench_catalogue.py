@@ -0,0 +1,60 @@
+"""Compare GET /products served from the catalogue snapshot with the route
+that queries MongoDB and serializes every request.
+
+Modes:
+    query           snapshot and response cache bypassed: find + build dicts
+                    + JSON encode per request (the route before caching)
+    response-cache  serialized-response cache keyed by catalogue version
+    snapshot        per-worker pre-serialized catalogue snapshot
+
+    MONGO_URI=mongodb://localhost:27017 python bench_catalogue.py --products 2000 --requests 500
+"""
+import argparse
+import time
+
+from app import catalogue, create_app, mongo, response_cache
+
+MODES = ('query', 'response-cache', 'snapshot')
+PATHS = ('/products?user_type=registered', '/products?category=Seeds&user_type=unregistered')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    app = create_app()
+    app.app_context().push()  # catalogue and response_cache are per-app
+    db = mongo.db
+    product_ids = db.products.insert_many([
+        {'name': f'Catalogue bench {i}', 'description': 'x' * 200, 'price_registered': 10.0 + i % 7,
+         'price_unregistered': 12.0 + i % 7, 'stock': 100, 'category': ('Seeds', 'Tools', 'Fertilizer')[i % 3],
+         'krishiBhavan': f'Krishi Bhavan {i % 10}', 'imageUrl': ''}
+        for i in range(args.products)
+    ]).inserted_ids
+
+    client = app.test_client()
+    mode_setting = catalogue.mode if catalogue.mode != 'off' else 'poll'
+    try:
+        for path in PATHS:
+            bodies = {}
+            for mode in MODES:
+                catalogue.mode = mode_setting if mode == 'snapshot' else 'off'
+                catalogue.reset()
+                response_cache.clear()
+                bodies[mode] = client.get(path).get_json()  # warm up
+                start = time.perf_counter()
+                for _ in range(args.requests):
+                    if mode == 'query':
+                        response_cache.clear()
+                    client.get(path)
+                us = (time.perf_counter() - start) / args.requests * 1e6
+                print(f"{path:52} {mode:15} {us:10.1f} us/request")
+            assert bodies['query'] == bodies['snapshot'] == bodies['response-cache'], 'responses differ between modes'
+    finally:
+        db.products.delete_many({'_id': {'$in': product_ids}})
+
+
+if __name__ == '__main__':
+    main()
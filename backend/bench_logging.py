@@ -0,0 +1,104 @@
+"""Measure logging overhead on GET /cart and GET /bookings.
+
+Modes:
+    off           logging disabled; the baseline
+    sync-payload  the old behaviour: synchronous text handler, every
+                  response body logged in full
+    sync          synchronous text handler with the current id/count logs
+    queue         the current setup: JSON records written by a background
+                  QueueListener thread
+
+    MONGO_URI=mongodb://localhost:27017 python bench_logging.py --lines 50 --requests 500
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from bson import ObjectId
+
+from app import create_app, mongo
+from auth import issue_token
+from request_logging import configure_logging
+
+app = create_app()
+MODES = ('off', 'sync-payload', 'sync', 'queue')
+
+
+def set_mode(mode, log_path):
+    logging.disable(logging.NOTSET)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if mode == 'off':
+        logging.disable(logging.CRITICAL)
+    elif mode == 'queue':
+        configure_logging(dict(app.config, LOG_FORMAT='json'), stream=open(log_path, 'a'))
+    else:
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=50, help='cart lines and bookings to seed')
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db = mongo.db
+    user_oid = ObjectId()
+    product_ids = db.products.insert_many([
+        {'name': f'Log bench {i}', 'description': 'x' * 200, 'price_registered': 10.0, 'price_unregistered': 12.0,
+         'stock': 100, 'category': 'Seeds', 'krishiBhavan': 'Krishi Bhavan 1', 'imageUrl': ''}
+        for i in range(args.lines)
+    ]).inserted_ids
+    db.cart.insert_many([{'user_id': user_oid, 'product_id': pid, 'quantity': 1} for pid in product_ids])
+    db.bookings.insert_many([
+        {'user_id': str(user_oid), 'product_name': f'Log bench {i}', 'product_id': str(pid), 'quantity': 1,
+         'krishiBhavan': 'Krishi Bhavan 1', 'booking_date_time': '2025-01-01T00:00:00Z', 'total_amount': 10.0,
+         'collection_status': 'pending'}
+        for i, pid in enumerate(product_ids)
+    ])
+
+    log_payloads = {'enabled': False}
+
+    @app.after_request
+    def _log_full_payload(response):
+        if log_payloads['enabled']:
+            logging.getLogger('app').info("Response for %s: %s", app.name, response.get_data(as_text=True))
+        return response
+
+    client = app.test_client()
+    with app.app_context():
+        headers = {'Authorization': f"Bearer {issue_token(user_oid, 'customer')}"}
+    log_path = os.path.join(tempfile.mkdtemp(), 'bench.log')
+    try:
+        results = {}
+        for mode in MODES:
+            set_mode(mode, log_path)
+            log_payloads['enabled'] = mode == 'sync-payload'
+            for path in ('/cart', '/bookings'):
+                client.get(path, headers=headers)  # warm up
+                start = time.perf_counter()
+                for _ in range(args.requests):
+                    client.get(path, headers=headers)
+                results[(mode, path)] = (time.perf_counter() - start) / args.requests * 1e6
+    finally:
+        logging.disable(logging.NOTSET)
+        db.cart.delete_many({'user_id': user_oid})
+        db.bookings.delete_many({'user_id': str(user_oid)})
+        db.products.delete_many({'_id': {'$in': product_ids}})
+
+    for path in ('/cart', '/bookings'):
+        baseline = results[('off', path)]
+        for mode in MODES:
+            us = results[(mode, path)]
+            print(f"{path:10} {mode:13} {us:9.1f} us/request  overhead {us - baseline:+8.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Check that /products latency stays flat while a login storm is running.
+
+Starts the app on a local threaded server, measures /products latency on its
+own, then again while many clients hammer /login at the same time. Also
+reports how many logins were shed with 503 by the auth pool.
+
+    MONGO_URI=mongodb://localhost:27017 python bench_login_storm.py --logins 200 --clients 50
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from werkzeug.serving import make_server
+
+from app import create_app, mongo
+
+EMAIL = 'login-storm@bench.local'
+PASSWORD = 'bench-password'
+
+
+def timed_get(url):
+    start = time.perf_counter()
+    urllib.request.urlopen(url).read()
+    return (time.perf_counter() - start) * 1000
+
+
+def post_login(url, results):
+    body = json.dumps({'email': EMAIL, 'password': PASSWORD}).encode('utf-8')
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    try:
+        urllib.request.urlopen(req).read()
+        results.append(200)
+    except urllib.error.HTTPError as e:
+        results.append(e.code)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        'p50': statistics.median(samples),
+        'p95': samples[int(len(samples) * 0.95) - 1],
+        'max': samples[-1]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--samples', type=int, default=100)
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        users = mongo.db.users
+    users.delete_many({'email': EMAIL})
+    users.insert_one({
+        'name': 'Bench', 'email': EMAIL, 'phone': None, 'address': None, 'pincode': None,
+        'password': app.extensions['passwords'].hash(PASSWORD), 'uniqueId': None, 'role': 'customer'
+    })
+
+    server = make_server('127.0.0.1', args.port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{args.port}'
+
+    try:
+        idle = [timed_get(base + '/products') for _ in range(args.samples)]
+
+        statuses = []
+        remaining = iter(range(args.logins))
+        lock = threading.Lock()
+
+        def storm():
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                post_login(base + '/login', statuses)
+
+        stormers = [threading.Thread(target=storm) for _ in range(args.clients)]
+        for t in stormers:
+            t.start()
+        loaded = []
+        while any(t.is_alive() for t in stormers) and len(loaded) < args.samples:
+            loaded.append(timed_get(base + '/products'))
+        for t in stormers:
+            t.join()
+    finally:
+        server.shutdown()
+        users.delete_many({'email': EMAIL})
+
+    for label, samples in (('idle', idle), ('login storm', loaded)):
+        if not samples:
+            continue
+        stats = percentiles(samples)
+        print(f"/products {label:12} p50={stats['p50']:.1f}ms p95={stats['p95']:.1f}ms max={stats['max']:.1f}ms")
+    print(f"logins: {statuses.count(200)} ok, {statuses.count(503)} shed with 503, {len(statuses)} total")
+
+
+if __name__ == '__main__':
+    main()
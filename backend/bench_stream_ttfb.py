@@ -0,0 +1,53 @@
+"""Compare time-to-first-byte of /get_product_details and its streaming variant.
+
+Runs against the offline fake model, so no Gemini API key is needed:
+
+    MONGO_URI=mongodb://localhost:27017 python bench_stream_ttfb.py --latency 1.5 --chunk-delay 0.1
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("GEMINI_FAKE", "1")
+os.environ.setdefault("DESCRIPTION_CACHE_BACKEND", "memory")
+
+from app import create_app  # noqa: E402
+
+
+def first_byte_and_total(client, url):
+    start = time.perf_counter()
+    response = client.get(url, buffered=False)
+    body = iter(response.response)
+    next(body)
+    ttfb = time.perf_counter() - start
+    for _ in body:
+        pass
+    response.close()
+    return ttfb * 1000, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', type=float, default=1.5, help='fake model delay before the first chunk')
+    parser.add_argument('--chunk-delay', type=float, default=0.1, help='fake model delay between chunks')
+    args = parser.parse_args()
+
+    app = create_app()
+    model = app.extensions['gemini'].model
+    model.latency = args.latency
+    model.chunk_delay = args.chunk_delay
+    client = app.test_client()
+
+    rows = [
+        ('one-shot, cold', '/get_product_details?id=1'),
+        ('one-shot, cached', '/get_product_details?id=1'),
+        ('stream, cold', '/get_product_details/stream?id=2'),
+        ('stream, cached', '/get_product_details/stream?id=2'),
+    ]
+    for label, url in rows:
+        ttfb, total = first_byte_and_total(client, url)
+        print(f"{label:18} ttfb={ttfb:8.1f}ms total={total:8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,376 @@
+"""Repeatable load scenarios for the backend, with JSON results for regression comparison.
+
+Seeds a dedicated database, serves the app on a local threaded server
+against it, and drives each scenario with concurrent HTTP clients:
+
+    login_storm    POST /login for random seeded users
+    browse         product lists (snapshot, filtered, searched, paginated),
+                   product details and varieties
+    cart_sync      POST /cart/batch followed by GET /cart, users with large carts
+    booking_burst  POST /bookings on a handful of hot products
+
+For every scenario it reports throughput, latency p50/p95/p99 and MongoDB
+round trips per request (from the X-DB-Calls debug header). Gemini is the
+offline fake model, so no API key is used.
+
+    # In-memory MongoDB stand-in (pip install mongomock), smaller volumes
+    python bench_suite.py --mongomock --users 20000 --products 2000 --output run.json
+
+    # Local mongod, full volumes, compared against an earlier run
+    MONGO_URI=mongodb://localhost:27017 python bench_suite.py --output run.json --baseline baseline.json
+
+The database named by --db-name is dropped before seeding and again at
+the end (unless --keep).
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("GEMINI_FAKE", "1")
+os.environ.setdefault("FAKE_MODEL_LATENCY", "0.2")
+os.environ.setdefault("FAKE_MODEL_CHUNK_DELAY", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import bcrypt  # noqa: E402
+from bson import ObjectId  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+SCENARIOS = ('login_storm', 'browse', 'cart_sync', 'booking_burst')  # default run order
+CATEGORIES = ('Seeds', 'Fertilizer', 'Tools', 'Saplings', 'Pesticides', 'Irrigation')
+SEARCH_TERMS = ('mango', 'organic', 'hybrid', 'drip', 'neem', 'banana')
+PASSWORD = 'bench-password'
+BATCH = 10000
+# mongomock has no command monitoring, so its collection calls are counted as round trips instead
+MONGOMOCK_COUNTED = ('find', 'find_one', 'find_one_and_update', 'insert_one', 'insert_many', 'update_one',
+                     'update_many', 'delete_one', 'delete_many', 'bulk_write', 'aggregate', 'count_documents')
+
+
+def use_mongomock():
+    from mongomock.collection import Collection
+
+    import metrics
+    import mongo as mongo_module
+    import mongomock_async
+
+    # The async views' client sees the same in-memory data as the sync one
+    mongo_module.MongoClient, mongo_module.AsyncMongoClient = mongomock_async.client_classes()
+    # mongomock implements some methods on top of others (find_one calls
+    # find), so only the outermost call on a thread is a round trip
+    depth = threading.local()
+    for name in MONGOMOCK_COUNTED:
+        original = getattr(Collection, name)
+
+        def counted(self, *args, _original=original, **kwargs):
+            outermost = not getattr(depth, 'value', 0)
+            if outermost:
+                metrics.count_db_call()
+                # mongomock may modify filter/projection dicts in place, which breaks
+                # module-level projections shared between server threads
+                args = tuple(dict(arg) if isinstance(arg, dict) else arg for arg in args)
+                kwargs = {key: dict(value) if isinstance(value, dict) else value for key, value in kwargs.items()}
+            depth.value = getattr(depth, 'value', 0) + 1
+            try:
+                return _original(self, *args, **kwargs)
+            finally:
+                depth.value -= 1
+        setattr(Collection, name, counted)
+
+
+def insert_batched(collection, documents):
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= BATCH:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+
+
+def seed(db, args, rounds):
+    """Seed users, products, carts and booking histories; returns what the scenarios need."""
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    # One hash shared by every user: hashing 100k passwords would take hours
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+    insert_batched(db.users, (
+        {'name': f'Bench user {i}', 'email': f'user{i}@bench.local', 'phone': f'9{i:09d}',
+         'address': f'House {i}, Ward {i % 40}', 'pincode': f'68{i % 10000:04d}', 'password': password_hash,
+         'uniqueId': None, 'role': 'seller' if i % 100 == 0 else 'customer'}
+        for i in range(args.users)
+    ))
+
+    product_ids = [ObjectId() for _ in range(args.products)]
+    insert_batched(db.products, (
+        {'_id': product_id, 'name': f'{rng.choice(SEARCH_TERMS).title()} product {i}',
+         'description': f'{rng.choice(SEARCH_TERMS)} ' + 'x' * 150, 'price_registered': round(rng.uniform(10, 900), 2),
+         'price_unregistered': round(rng.uniform(12, 1000), 2), 'stock': 10 ** 6,
+         'category': CATEGORIES[i % len(CATEGORIES)], 'krishiBhavan': f'Krishi Bhavan {i % 50}', 'imageUrl': ''}
+        for i, product_id in enumerate(product_ids)
+    ))
+
+    user_ids = [user['_id'] for user in db.users.find({'role': 'customer'}, {'_id': 1}).limit(args.active_users)]
+    insert_batched(db.cart, (
+        {'user_id': user_id, 'product_id': product_id, 'quantity': rng.randint(1, 5)}
+        for user_id in user_ids for product_id in rng.sample(product_ids, args.cart_lines)
+    ))
+    now = datetime.now(timezone.utc)
+    insert_batched(db.bookings, (
+        {'user_id': str(user_id), 'product_name': 'Seeded booking', 'product_id': str(rng.choice(product_ids)),
+         'quantity': 1, 'krishiBhavan': f'Krishi Bhavan {rng.randrange(50)}',
+         'booking_date_time': now - timedelta(minutes=rng.randrange(60 * 24 * 365)),
+         'total_amount': round(rng.uniform(10, 900), 2),
+         'collection_status': rng.choice(('pending', 'confirmed', 'collected', 'cancelled'))}
+        for user_id in user_ids for _ in range(args.bookings_per_user)
+    ))
+    return {
+        'product_ids': [str(product_id) for product_id in product_ids],
+        'user_ids': [str(user_id) for user_id in user_ids],
+        'seconds': round(time.perf_counter() - start, 2),
+    }
+
+
+# ========================== SCENARIOS ========================== #
+
+def login_storm(rng, data, args):
+    email = f'user{rng.randrange(args.users)}@bench.local'
+    return 'POST', '/login', {'email': email, 'password': PASSWORD}, None
+
+
+def browse(rng, data, args):
+    roll = rng.random()
+    if roll < 0.35:
+        return 'GET', f"/products?user_type={rng.choice(('registered', 'unregistered'))}", None, None
+    if roll < 0.55:
+        return 'GET', f'/products?category={rng.choice(CATEGORIES)}&limit=20', None, None
+    if roll < 0.70:
+        return 'GET', f'/products?q={rng.choice(SEARCH_TERMS)}&limit=20', None, None
+    if roll < 0.80:
+        return 'GET', f"/products?sort=-price&krishiBhavan=Krishi+Bhavan+{rng.randrange(50)}&limit=20", None, None
+    if roll < 0.95:
+        return 'GET', f'/get_product_details?id={rng.randint(1, 12)}', None, None
+    return 'GET', f"/varieties?type={rng.choice(('Mango', 'Bean', 'Banana'))}", None, None
+
+
+def cart_sync(rng, data, args):
+    user_id = rng.choice(data['user_ids'])
+    if rng.random() < 0.5:
+        return 'GET', '/cart', None, user_id
+    operations = [
+        {'op': rng.choice(('add', 'update', 'remove')), 'product_id': rng.choice(data['product_ids']),
+         'quantity': rng.randint(1, 5)}
+        for _ in range(rng.randint(1, 10))
+    ]
+    return 'POST', '/cart/batch', {'operations': operations}, user_id
+
+
+def booking_burst(rng, data, args):
+    product_id = data['product_ids'][rng.randrange(5)]  # a few hot products
+    return 'POST', '/bookings', {
+        'product_name': 'Hot product', 'product_id': product_id, 'quantity': 1, 'krishiBhavan': 'Krishi Bhavan 0',
+        'booking_date_time': datetime.now(timezone.utc).isoformat(), 'total_amount': 100.0,
+    }, rng.choice(data['user_ids'])
+
+
+REQUEST_MAKERS = {
+    'login_storm': login_storm,
+    'browse': browse,
+    'cart_sync': cart_sync,
+    'booking_burst': booking_burst,
+}
+
+
+def send(base, method, path, body, token=None):
+    payload = json.dumps(body).encode('utf-8') if body is not None else None
+    headers = {'Content-Type': 'application/json'} if payload else {}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    request = urllib.request.Request(base + path, data=payload, method=method, headers=headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status, headers = response.status, response.headers
+    except urllib.error.HTTPError as e:
+        e.read()
+        status, headers = e.code, e.headers
+    return (time.perf_counter() - start) * 1000, status, headers.get('X-DB-Calls')
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return None
+    index = max(0, min(len(sorted_samples) - 1, int(round(pct / 100 * len(sorted_samples))) - 1))
+    return round(sorted_samples[index], 3)
+
+
+def run_scenario(base, name, data, args):
+    make_request = REQUEST_MAKERS[name]
+    counter = iter(range(args.requests))
+    lock = threading.Lock()
+    samples = []
+
+    def client(seed):
+        rng = random.Random(seed)
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            method, path, body, user_id = make_request(rng, data, args)
+            result = send(base, method, path, body, data['tokens'].get(user_id))
+            with lock:
+                samples.append(result)
+
+    threads = [threading.Thread(target=client, args=(args.seed * 1000 + i,)) for i in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(sample[0] for sample in samples)
+    statuses = {}
+    for _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    db_calls = [int(sample[2]) for sample in samples if sample[2] is not None]
+    return {
+        'requests': len(samples),
+        'concurrency': args.concurrency,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95), 'p99': percentile(latencies, 99),
+            'max': round(latencies[-1], 3) if latencies else None,
+            'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+        },
+        'db_calls_per_request': round(sum(db_calls) / len(db_calls), 2) if db_calls else None,
+        'status_counts': statuses,
+        'server_errors': sum(count for status, count in statuses.items() if status.startswith('5')),
+    }
+
+
+def compare(baseline, results, tolerance):
+    """Print per-scenario changes against a baseline run; returns True if anything regressed."""
+    regressed = False
+    for name, current in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        checks = [
+            ('p95 ms', before['latency_ms']['p95'], current['latency_ms']['p95'], True),
+            ('p99 ms', before['latency_ms']['p99'], current['latency_ms']['p99'], True),
+            ('rps', before['throughput_rps'], current['throughput_rps'], False),
+            ('db calls', before['db_calls_per_request'], current['db_calls_per_request'], True),
+        ]
+        for label, old, new, lower_is_better in checks:
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > tolerance if lower_is_better else change < -tolerance
+            regressed = regressed or worse
+            print(f"{name:14} {label:9} {old:10.2f} -> {new:10.2f} ({change:+7.1%}){'  REGRESSION' if worse else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongomock', action='store_true', help='use the in-memory mongomock stand-in')
+    parser.add_argument('--db-name', default='krishi_bench')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--active-users', type=int, default=200, help='users given large carts and booking histories')
+    parser.add_argument('--cart-lines', type=int, default=50)
+    parser.add_argument('--bookings-per-user', type=int, default=200)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=1000, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--bcrypt-rounds', type=int, default=None, help='bcrypt work factor for seeded passwords and the app')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--port', type=int, default=5077)
+    parser.add_argument('--output', help='write results as JSON to this file (default stdout)')
+    parser.add_argument('--baseline', help='results JSON from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative regression')
+    parser.add_argument('--keep', action='store_true', help='keep the seeded database')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.mongomock:
+        use_mongomock()
+
+    from app import create_app, mongo
+    from auth import issue_token
+    from indexes import ensure_indexes
+
+    overrides = {'MONGO_DB_NAME': args.db_name, 'METRICS_DEBUG_HEADER': True, 'DEBUG': False}
+    if args.bcrypt_rounds:
+        # The app must use the seeded work factor too, or every login queues a rehash
+        overrides['BCRYPT_ROUNDS'] = args.bcrypt_rounds
+    app = create_app(overrides)
+    with app.app_context():
+        client, db = mongo.client, mongo.db
+    client.drop_database(args.db_name)
+    data = seed(db, args, app.config['BCRYPT_ROUNDS'])
+    ensure_indexes(db)  # as serve.py does at startup
+    with app.app_context():
+        # Signed in up front, as the frontend would be after /login
+        data['tokens'] = {user_id: issue_token(user_id, 'customer') for user_id in data['user_ids']}
+    print(f"Seeded {args.users} users, {args.products} products in {data['seconds']}s", file=sys.stderr)
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # no line per request
+    server = make_server('127.0.0.1', args.port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{args.port}'
+    results = {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'backend': 'mongomock' if args.mongomock else 'mongodb',
+            'python': platform.python_version(),
+            'volumes': {'users': args.users, 'products': args.products, 'active_users': args.active_users,
+                        'cart_lines': args.cart_lines, 'bookings_per_user': args.bookings_per_user},
+            'requests_per_scenario': args.requests,
+            'concurrency': args.concurrency,
+            'seed_seconds': data['seconds'],
+        },
+        'scenarios': {},
+    }
+    try:
+        for name in scenarios:
+            results['scenarios'][name] = run_scenario(base, name, data, args)
+            summary = results['scenarios'][name]
+            print(f"{name:14} {summary['throughput_rps']:9.1f} rps  p50 {summary['latency_ms']['p50']:8.2f}ms  "
+                  f"p95 {summary['latency_ms']['p95']:8.2f}ms  p99 {summary['latency_ms']['p99']:8.2f}ms  "
+                  f"db/req {summary['db_calls_per_request']}", file=sys.stderr)
+    finally:
+        server.shutdown()
+        if not args.keep:
+            client.drop_database(args.db_name)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(baseline, results, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
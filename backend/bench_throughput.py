@@ -0,0 +1,112 @@
+"""Compare throughput of the development server and the production server.
+
+Starts each server in a subprocess, drives it with concurrent clients for a
+fixed duration and reports requests/second and latency percentiles. The
+Gemini model is replaced with the offline fake (GEMINI_FAKE=1) so slow AI
+calls can be mixed in without an API key.
+
+    MONGO_URI=mongodb://localhost:27017 python bench_throughput.py --clients 32 --duration 10 \\
+        --path /products --path "/get_product_details/stream?id=1"
+"""
+import argparse
+import itertools
+import os
+import secrets
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SERVERS = {
+    # werkzeug logs every request at INFO whatever LOG_LEVEL says
+    'dev': [sys.executable, '-c', 'import logging, os; from app import create_app; '
+            'logging.getLogger("werkzeug").setLevel(logging.WARNING); create_app().run(port=int(os.environ["PORT"]))'],
+    'prod': [sys.executable, 'serve.py'],
+}
+APP_ENVS = {'dev': 'development', 'prod': 'production'}
+
+
+def wait_until_up(base, server, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with status {server.returncode} (see its output above)")
+        try:
+            urllib.request.urlopen(base + '/products?limit=1').read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base} did not start")
+
+
+def drive(base, paths, clients, duration):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def client(offset):
+        for path in itertools.islice(itertools.cycle(paths), offset, None):
+            if time.time() >= deadline:
+                return
+            start = time.perf_counter()
+            try:
+                urllib.request.urlopen(base + path).read()
+                with lock:
+                    latencies.append((time.perf_counter() - start) * 1000)
+            except (urllib.error.URLError, ConnectionError) as e:
+                with lock:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors
+
+
+def bench(name, args):
+    env = dict(os.environ, PORT=str(args.port), GEMINI_FAKE='1', DESCRIPTION_CACHE_BACKEND='memory',
+               DESCRIPTION_CACHE_SIZE='0', WEB_WORKERS=str(args.workers), WEB_THREADS=str(args.threads),
+               APP_ENV=APP_ENVS[name], LOG_LEVEL=os.environ.get('LOG_LEVEL', 'WARNING'))
+    # The production config refuses to start without a signing key
+    env['SECRET_KEY'] = env.get('SECRET_KEY') or secrets.token_urlsafe(32)
+    # Server errors (and warnings) go to our stderr so a failed start is explained
+    server = subprocess.Popen(SERVERS[name], cwd=HERE, env=env, stdout=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{args.port}'
+    try:
+        wait_until_up(base, server)
+        latencies, errors = drive(base, args.path or ['/products'], args.clients, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else float('nan')  # noqa: E731
+    print(f"{name:5} {len(latencies) / args.duration:8.1f} req/s  "
+          f"p50={statistics.median(latencies) if latencies else float('nan'):.1f}ms "
+          f"p95={pct(0.95):.1f}ms p99={pct(0.99):.1f}ms errors={len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', action='append', help='path to request (repeatable)')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--server', choices=sorted(SERVERS), action='append', help='server(s) to bench (default: both)')
+    args = parser.parse_args()
+
+    for name in args.server or ['dev', 'prod']:
+        bench(name, args)
+
+
+if __name__ == '__main__':
+    main()
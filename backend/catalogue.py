@@ -0,0 +1,180 @@
+"""Per-worker, pre-serialized snapshot of the product catalogue.
+
+Each product is kept as compact JSON bytes, once per price view (both
+prices, registered only, unregistered only). Products are grouped by
+category and Krishi Bhavan. A filtered list is then a join of ready-made
+bytes, memoized until the catalogue changes.
+
+The snapshot stays current by one of two methods:
+- changestream: a background thread follows a MongoDB change stream on
+  products and applies each insert, update or delete in place. This needs
+  a replica set or sharded cluster.
+- poll: before serving, the snapshot compares the catalogue version
+  counter (see http_cache.py) with the one it was built from, and reloads
+  when the counter has moved. Other requests keep the old snapshot until
+  the reload finishes.
+
+If a change stream cannot be opened, or it fails later, the snapshot falls
+back to polling.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+PRICE_FIELDS = {'registered': 'price_registered', 'unregistered': 'price_unregistered'}
+# Price view (user_type) -> price fields included
+PRICE_VIEWS = {None: tuple(PRICE_FIELDS.values()), **{user_type: (field,) for user_type, field in PRICE_FIELDS.items()}}
+
+
+def serialize_product(product, price_fields):
+    """The GET /products representation of a product document."""
+    product_data = {
+        'id': str(product['_id']),
+        'name': product['name'],
+        'description': product.get('description', ''),
+        'stock': product.get('stock', 0),
+        'category': product['category'],
+        'krishiBhavan': product.get('krishiBhavan', ''),
+        'imageUrl': product.get('imageUrl', '')
+    }
+    for field in price_fields:
+        product_data[field] = product.get(field, 0)  # Default to 0 if not found
+    return product_data
+
+
+def _encode(value):
+    # Same key order and escaping as Flask's JSON provider, minus whitespace
+    return json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _group_keys(category, krishi_bhavan):
+    return ((None, None), (category, None), (None, krishi_bhavan), (category, krishi_bhavan))
+
+
+class CatalogueSnapshot:
+    def __init__(self, get_collection, get_version, projection, mode='changestream'):
+        self.get_collection = get_collection
+        self.get_version = get_version
+        self.projection = projection
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._pid = None
+        self._watching = False
+        self._version = None
+        self._entries = {}   # _id -> (category, krishiBhavan, {price view: bytes})
+        self._groups = {}    # (category, krishiBhavan), either may be None -> set of _id
+        self._memo = {}      # (category, krishiBhavan, price view) -> (body, etag)
+
+    # ----- building ----- #
+
+    def _encode_product(self, product):
+        views = {view: _encode(serialize_product(product, fields)) for view, fields in PRICE_VIEWS.items()}
+        return product['category'], product.get('krishiBhavan'), views
+
+    def _add(self, entries, groups, product):
+        try:
+            entry = self._encode_product(product)
+        except KeyError:
+            logger.warning("Leaving product %s out of the catalogue snapshot: missing category or name", product['_id'])
+            return
+        entries[product['_id']] = entry
+        for key in _group_keys(entry[0], entry[1]):
+            groups.setdefault(key, set()).add(product['_id'])
+
+    def _remove(self, product_id):
+        entry = self._entries.pop(product_id, None)
+        if entry is not None:
+            for key in _group_keys(entry[0], entry[1]):
+                self._groups.get(key, set()).discard(product_id)
+
+    def _load(self):
+        entries, groups = {}, {}
+        for product in self.get_collection().find({}, self.projection):
+            self._add(entries, groups, product)
+        with self._lock:
+            self._entries, self._groups, self._memo = entries, groups, {}
+        logger.info("Loaded catalogue snapshot with %d products", len(entries))
+
+    def _apply(self, change):
+        operation = change['operationType']
+        if operation in ('drop', 'rename', 'dropDatabase', 'invalidate'):
+            self._load()
+            return
+        product_id = change['documentKey']['_id']
+        product = change.get('fullDocument')
+        with self._lock:
+            self._remove(product_id)
+            if operation != 'delete' and product is not None:
+                self._add(self._entries, self._groups, product)
+            self._memo = {}
+
+    # ----- staying current ----- #
+
+    def _follow(self, stream):
+        try:
+            with stream:
+                for change in stream:
+                    self._apply(change)
+        except Exception as e:
+            logger.warning("Catalogue change stream stopped (%s); falling back to polling", e)
+        # Polling reloads on the next request that sees a newer version
+        self._watching = False
+        self._version = None
+
+    def _start(self):
+        self.reset()
+        self._pid = os.getpid()
+        if self.mode != 'changestream':
+            return
+        try:
+            # Open the stream before loading so no change in between is missed
+            stream = self.get_collection().watch(full_document='updateLookup')
+        except Exception as e:
+            logger.info("Change streams unavailable (%s); polling the catalogue version instead", e)
+            return
+        self._load()
+        self._watching = True
+        threading.Thread(target=self._follow, args=(stream,), name='catalogue-watch', daemon=True).start()
+
+    def _ensure_current(self):
+        if self._pid != os.getpid():
+            # Threads don't survive fork(), so each worker starts its own
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    self._start()
+        if self._watching:
+            return
+        version = self.get_version()
+        if version == self._version:
+            return
+        # Only the first load makes requests wait; later ones serve the old snapshot meanwhile
+        if self._refresh_lock.acquire(blocking=self._version is None):
+            try:
+                if version != self._version:
+                    self._load()
+                    self._version = version
+            finally:
+                self._refresh_lock.release()
+
+    # ----- reading ----- #
+
+    def get(self, category=None, krishi_bhavan=None, user_type=None):
+        """JSON array bytes for the filtered product list, and a strong ETag."""
+        self._ensure_current()
+        key = (category, krishi_bhavan, user_type)
+        with self._lock:
+            cached = self._memo.get(key)
+            if cached is None:
+                product_ids = sorted(self._groups.get((category, krishi_bhavan), ()))
+                body = b'[' + b','.join(self._entries[product_id][2][user_type] for product_id in product_ids) + b']'
+                cached = self._memo[key] = (body, hashlib.sha1(body).hexdigest()[:24])
+        return cached
@@ -0,0 +1,142 @@
+"""Per-environment settings for create_app.
+
+Pick one with APP_ENV=development|production|testing (default development).
+Every MongoDB setting can also be overridden from the environment.
+"""
+import os
+
+from dotenv import load_dotenv
+
+# Settings below are read once, at import, so .env must be loaded first
+load_dotenv()
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+class Config:
+    MONGO_URI = os.environ.get("MONGO_URI")
+    MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME", "mydatabase")
+
+    # Connection pool (per worker process)
+    MONGO_MAX_POOL_SIZE = _env_int("MONGO_MAX_POOL_SIZE", 100)
+    MONGO_MIN_POOL_SIZE = _env_int("MONGO_MIN_POOL_SIZE", 0)
+    MONGO_MAX_IDLE_TIME_MS = _env_int("MONGO_MAX_IDLE_TIME_MS", None)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = _env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS", None)
+
+    # Timeouts
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 30000)
+    MONGO_CONNECT_TIMEOUT_MS = _env_int("MONGO_CONNECT_TIMEOUT_MS", 20000)
+    MONGO_SOCKET_TIMEOUT_MS = _env_int("MONGO_SOCKET_TIMEOUT_MS", None)
+
+    # Read/write concerns. Reads that tolerate slight staleness (/products,
+    # GET /bookings) use MONGO_SECONDARY_READ_PREFERENCE.
+    MONGO_READ_PREFERENCE = os.environ.get("MONGO_READ_PREFERENCE", "primary")
+    MONGO_SECONDARY_READ_PREFERENCE = os.environ.get("MONGO_SECONDARY_READ_PREFERENCE", "secondaryPreferred")
+    MONGO_READ_CONCERN = os.environ.get("MONGO_READ_CONCERN", None)
+    MONGO_WRITE_CONCERN_W = os.environ.get("MONGO_WRITE_CONCERN_W", None)
+    MONGO_WRITE_CONCERN_J = os.environ.get("MONGO_WRITE_CONCERN_J", None)
+
+    # Book stock inside multi-document transactions (replica sets/mongos only);
+    # otherwise reservations use compensating rollbacks
+    MONGO_TRANSACTIONS = os.environ.get("MONGO_TRANSACTIONS", "").lower() in ('1', 'true', 'yes')
+
+    # Create indexes once when the server starts (serve.py, python app.py),
+    # before any request; `flask --app app ensure-indexes` does it on demand
+    MONGO_ENSURE_INDEXES = os.environ.get("MONGO_ENSURE_INDEXES", "1").lower() in ('1', 'true', 'yes')
+
+    GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+    GEMINI_MODEL_NAME = os.environ.get("GEMINI_MODEL_NAME", "gemini-2.0-flash")
+    GEMINI_FAKE = bool(os.environ.get("GEMINI_FAKE"))
+    # Gemini gateway (see model_gateway.py): calls in flight per worker, the
+    # rate calls may start at (token bucket), per-call and queueing timeouts
+    # in seconds, and how long to stop calling after a quota error
+    GEMINI_MAX_CONCURRENCY = _env_int("GEMINI_MAX_CONCURRENCY", 4)
+    GEMINI_RATE_PER_SECOND = float(os.environ.get("GEMINI_RATE_PER_SECOND", 1.0))
+    GEMINI_BURST = _env_int("GEMINI_BURST", 5)
+    GEMINI_TIMEOUT = float(os.environ.get("GEMINI_TIMEOUT", 20))
+    GEMINI_QUEUE_TIMEOUT = float(os.environ.get("GEMINI_QUEUE_TIMEOUT", 2))
+    GEMINI_QUOTA_COOLDOWN = float(os.environ.get("GEMINI_QUOTA_COOLDOWN", 30))
+
+    CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "http://localhost:5173")
+
+    # Password hashing pool (see passwords.py)
+    BCRYPT_ROUNDS = _env_int("BCRYPT_ROUNDS", 12)
+    AUTH_POOL_WORKERS = _env_int("AUTH_POOL_WORKERS", 2)
+    AUTH_QUEUE_DEPTH = _env_int("AUTH_QUEUE_DEPTH", 32)
+    AUTH_TIMEOUT = float(os.environ.get("AUTH_TIMEOUT", 10))
+
+    # AI description cache (see description_cache.py): mongo, disk or memory
+    DESCRIPTION_CACHE_BACKEND = os.environ.get("DESCRIPTION_CACHE_BACKEND", "mongo")
+    DESCRIPTION_CACHE_DIR = os.environ.get("DESCRIPTION_CACHE_DIR")
+    DESCRIPTION_CACHE_SIZE = _env_int("DESCRIPTION_CACHE_SIZE", 256)
+    DESCRIPTION_CACHE_TTL = _env_int("DESCRIPTION_CACHE_TTL", 7 * 24 * 3600)
+
+    # Access tokens (see auth.py). SECRET_KEY has no default outside
+    # development and testing.
+    SECRET_KEY = os.environ.get("SECRET_KEY")
+    ACCESS_TOKEN_TTL = _env_int("ACCESS_TOKEN_TTL", 12 * 3600)
+    TOKEN_CACHE_TTL = _env_int("TOKEN_CACHE_TTL", 60)
+    TOKEN_CACHE_SIZE = _env_int("TOKEN_CACHE_SIZE", 10000)
+
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+    # Access-log sampling per endpoint, e.g. "api.get_products=0.1"
+    LOG_SAMPLE_RATES = os.environ.get("LOG_SAMPLE_RATES", "")
+    LOG_REDACT_FIELDS = os.environ.get(
+        "LOG_REDACT_FIELDS", "password,token,access_token,authorization,phone,address"
+    ).split(',')
+
+    # Add X-DB-Calls / X-DB-Time-ms headers to every response
+    METRICS_DEBUG_HEADER = os.environ.get("METRICS_DEBUG_HEADER", "").lower() in ('1', 'true', 'yes')
+
+    # HTTP caching of /products and /get_product_details (see http_cache.py).
+    # Serialized responses kept per worker, how long a worker trusts its copy
+    # of the catalogue version, and the lifetime of a cached response.
+    HTTP_CACHE_SIZE = _env_int("HTTP_CACHE_SIZE", 512)
+    CATALOGUE_VERSION_TTL = float(os.environ.get("CATALOGUE_VERSION_TTL", 1.0))
+    PRODUCTS_CACHE_TTL = _env_int("PRODUCTS_CACHE_TTL", 60)
+    # Browsers revalidate the product list every time (a cheap 304)
+    PRODUCTS_CACHE_CONTROL = os.environ.get("PRODUCTS_CACHE_CONTROL", "public, no-cache")
+    PRODUCT_DETAILS_MAX_AGE = _env_int("PRODUCT_DETAILS_MAX_AGE", 3600)
+    # Per-worker catalogue snapshot for /products: changestream, poll or off
+    CATALOGUE_SNAPSHOT = os.environ.get("CATALOGUE_SNAPSHOT", "changestream")
+
+    # Day boundaries for the seller dashboard rollups
+    SELLER_TIMEZONE = os.environ.get("SELLER_TIMEZONE", "Asia/Kolkata")
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key")
+    METRICS_DEBUG_HEADER = True
+    LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+    MONGO_MAX_POOL_SIZE = _env_int("MONGO_MAX_POOL_SIZE", 10)
+
+
+class ProductionConfig(Config):
+    MONGO_MIN_POOL_SIZE = _env_int("MONGO_MIN_POOL_SIZE", 5)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = _env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000)
+    MONGO_WRITE_CONCERN_W = os.environ.get("MONGO_WRITE_CONCERN_W", "majority")
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SECRET_KEY = os.environ.get("SECRET_KEY", "test-secret-key")
+    MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME", "mydatabase_test")
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 2000)
+    GEMINI_FAKE = True
+
+
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
+
+
+def get_config(name=None):
+    return CONFIGS[name or os.environ.get("APP_ENV", "development")]
@@ -0,0 +1,284 @@
+"""Cache for AI-generated product descriptions.
+
+Two tiers: a bounded in-process LRU in front of a shared store (MongoDB, or a
+directory of JSON files) so descriptions survive restarts and are shared
+between worker processes. Entries expire after a TTL, and every key is
+prefixed with a version derived from the prompt template so editing the
+prompt naturally invalidates old output.
+
+Concurrent misses for the same key are collapsed (single-flight): one caller
+runs the generator, the rest wait for its result (or its error). The
+`*_async` methods do the same for coroutines on the app's event loop, with
+MongoDB reads and writes awaited on the async client.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+
+def version_key(template):
+    """Short stable hash of the prompt template."""
+    return hashlib.sha1(template.encode('utf-8')).hexdigest()[:12]
+
+
+class MongoStore:
+    """Shared store backed by a collection with a TTL index on expires_at.
+
+    Takes zero-argument callables returning the collection (and the same
+    collection on the async client) so the MongoDB clients are only created
+    on first use.
+    """
+
+    def __init__(self, get_collection, get_async_collection=None):
+        self.get_collection = get_collection
+        self.get_async_collection = get_async_collection
+
+    def get(self, key):
+        return self._value(self.get_collection().find_one({'_id': key}))
+
+    async def get_async(self, key):
+        return self._value(await self.get_async_collection().find_one({'_id': key}))
+
+    @staticmethod
+    def _value(doc):
+        if not doc:
+            return None
+        expires_at = doc['expires_at']
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        # The TTL monitor only runs once a minute, so check expiry ourselves too
+        if expires_at <= datetime.now(timezone.utc):
+            return None
+        return doc['value']
+
+    @staticmethod
+    def _document(key, value, ttl):
+        return {'_id': key, 'value': value, 'expires_at': datetime.now(timezone.utc) + timedelta(seconds=ttl)}
+
+    def set(self, key, value, ttl):
+        self.get_collection().replace_one({'_id': key}, self._document(key, value, ttl), upsert=True)
+
+    async def set_async(self, key, value, ttl):
+        await self.get_async_collection().replace_one({'_id': key}, self._document(key, value, ttl), upsert=True)
+
+
+class DiskStore:
+    """Shared store keeping one JSON file per key in a directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry['expires_at'] <= time.time():
+            return None
+        return entry['value']
+
+    def set(self, key, value, ttl):
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'value': value, 'expires_at': time.time() + ttl}, f)
+        os.replace(tmp_path, path)  # atomic, so readers never see a partial file
+
+    async def get_async(self, key):
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key, value, ttl):
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+
+class DescriptionCache:
+    def __init__(self, store=None, version='', max_entries=256, ttl=7 * 24 * 3600):
+        self.store = store
+        self.version = version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> {'done': Event, 'value': leader's result, 'error': its exception}
+        self._inflight_async = {}  # key -> asyncio.Future, on the app's event loop
+        self.hits = 0
+        self.misses = 0
+
+    def _full_key(self, key):
+        return f'{self.version}:{key}'
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        full_key = self._full_key(key)
+        value = self._get_local(full_key)
+        if value is None and self.store is not None:
+            try:
+                value = self.store.get(full_key)
+            except Exception:
+                logger.exception("Description cache store read failed for %s", full_key)
+            if value is not None:
+                self._set_local(full_key, value)
+        self._count(value)
+        return value
+
+    async def get_async(self, key):
+        full_key = self._full_key(key)
+        value = self._get_local(full_key)
+        if value is None and self.store is not None:
+            try:
+                value = await self.store.get_async(full_key)
+            except Exception:
+                logger.exception("Description cache store read failed for %s", full_key)
+            if value is not None:
+                self._set_local(full_key, value)
+        self._count(value)
+        return value
+
+    def _count(self, value):
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    def count_hit(self):
+        """Record a lookup answered in front of this cache (app.py's response cache)."""
+        self.hits += 1
+
+    def set(self, key, value):
+        full_key = self._full_key(key)
+        self._set_local(full_key, value)
+        if self.store is not None:
+            try:
+                self.store.set(full_key, value, self.ttl)
+            except Exception:
+                logger.exception("Description cache store write failed for %s", full_key)
+
+    async def set_async(self, key, value):
+        full_key = self._full_key(key)
+        self._set_local(full_key, value)
+        if self.store is not None:
+            try:
+                await self.store.set_async(full_key, value, self.ttl)
+            except Exception:
+                logger.exception("Description cache store write failed for %s", full_key)
+
+    def get_or_create(self, key, factory):
+        """Return the cached value for key, running factory() once on a miss.
+
+        Callers that arrive while factory() is running share its result, or
+        its exception: a failure is not retried by each waiter in turn.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = {'done': threading.Event(), 'value': None, 'error': None}
+
+        if not leader:
+            # Another thread is generating this key; share its outcome
+            flight['done'].wait()
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['value']
+
+        try:
+            value = flight['value'] = factory()
+            self.set(key, value)
+            return value
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight['done'].set()
+
+    async def get_or_create_async(self, key, factory):
+        """get_or_create() for coroutines on the event loop; factory() returns an awaitable.
+
+        Single-flight is per event loop, so it doesn't coalesce with callers
+        of get_or_create() on other threads.
+        """
+        value = await self.get_async(key)
+        if value is not None:
+            return value
+
+        flight = self._inflight_async.get(key)
+        if flight is not None:
+            # shield: a waiter being cancelled must not cancel the leader
+            return await asyncio.shield(flight)
+
+        flight = self._inflight_async[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await factory()
+            await self.set_async(key, value)
+            flight.set_result(value)
+            return value
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        except asyncio.CancelledError:
+            flight.set_exception(RuntimeError(f'Generating {key} was cancelled'))
+            raise
+        finally:
+            if flight.done():
+                flight.exception()  # mark retrieved; there may be no waiters
+            del self._inflight_async[key]
+
+
+def create_description_cache(get_db, version, config, get_async_db=None):
+    """Build the cache from the app's DESCRIPTION_CACHE_* settings.
+
+    DESCRIPTION_CACHE_BACKEND  mongo (default), disk or memory
+    DESCRIPTION_CACHE_DIR      directory for the disk backend
+    DESCRIPTION_CACHE_SIZE     in-process LRU entries (default 256)
+    DESCRIPTION_CACHE_TTL      seconds before an entry expires (default 7 days)
+    """
+    backend = config['DESCRIPTION_CACHE_BACKEND']
+    if backend == 'mongo':
+        get_async_collection = (lambda: get_async_db()['product_details_cache']) if get_async_db else None
+        store = MongoStore(lambda: get_db()['product_details_cache'], get_async_collection)
+    elif backend == 'disk':
+        store = DiskStore(config['DESCRIPTION_CACHE_DIR'] or os.path.join(os.path.dirname(__file__), '.description_cache'))
+    else:
+        store = None
+    return DescriptionCache(
+        store=store,
+        version=version,
+        max_entries=config['DESCRIPTION_CACHE_SIZE'],
+        ttl=config['DESCRIPTION_CACHE_TTL']
+    )
@@ -0,0 +1,89 @@
+"""Offline stand-in for genai.GenerativeModel.
+
+Mimics the parts of the Gemini client the app uses: generate_content(prompt)
+returns an object with .text, generate_content(prompt, stream=True)
+yields chunks that each have .text, and generate_content_async(prompt) is
+the awaitable version of the former. Latency is simulated with sleeps so
+time-to-first-byte and throughput can be benchmarked without an API key.
+
+Enable in the app with GEMINI_FAKE=1; FAKE_MODEL_LATENCY (seconds before the
+first chunk) and FAKE_MODEL_CHUNK_DELAY (seconds between chunks) tune it.
+Quota errors (HTTP 429, like the real API's ResourceExhausted) can be
+simulated with FAKE_MODEL_RPM (calls allowed per rolling minute) and
+FAKE_MODEL_QUOTA_ERROR_RATE (fraction of calls failing at random).
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+FAKE_TEXT = (
+    "**Origin and History**\n\nA traditional Kerala variety grown for generations.\n\n"
+    "**Climate and Growth Conditions**\n\nThrives in warm, humid conditions with well-drained soil.\n\n"
+    "**Nutritional Value & Benefits**\n\nRich in vitamins, minerals and dietary fibre.\n\n"
+    "**Uses in Cooking & Daily Life**\n\nEaten fresh and used in many local dishes.\n"
+)
+
+
+class FakeQuotaError(Exception):
+    code = 429
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    def __init__(self, model_name='fake', latency=None, chunk_delay=None, text=FAKE_TEXT, chunk_size=40,
+                 rpm=None, quota_error_rate=None):
+        self.model_name = model_name
+        self.latency = float(os.environ.get("FAKE_MODEL_LATENCY", 2.0)) if latency is None else latency
+        self.chunk_delay = float(os.environ.get("FAKE_MODEL_CHUNK_DELAY", 0.1)) if chunk_delay is None else chunk_delay
+        self.text = text
+        self.chunk_size = chunk_size
+        self.rpm = int(os.environ.get("FAKE_MODEL_RPM", 0)) if rpm is None else rpm
+        self.quota_error_rate = (float(os.environ.get("FAKE_MODEL_QUOTA_ERROR_RATE", 0))
+                                 if quota_error_rate is None else quota_error_rate)
+        self.calls = 0
+        self.quota_errors = 0
+        self._recent = deque()  # start times of calls in the last minute
+        self._lock = threading.Lock()
+
+    def _check_quota(self):
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and self._recent[0] <= now - 60:
+                self._recent.popleft()
+            over_rpm = self.rpm and len(self._recent) >= self.rpm
+            if over_rpm or random.random() < self.quota_error_rate:
+                self.quota_errors += 1
+                raise FakeQuotaError('429 Resource has been exhausted (e.g. check quota).')
+            self._recent.append(now)
+
+    def _chunks(self):
+        return [self.text[i:i + self.chunk_size] for i in range(0, len(self.text), self.chunk_size)]
+
+    def _stream(self):
+        time.sleep(self.latency)
+        for i, chunk in enumerate(self._chunks()):
+            if i:
+                time.sleep(self.chunk_delay)
+            yield FakeResponse(chunk)
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        self._check_quota()
+        if stream:
+            return self._stream()
+        # A full response takes as long as streaming every chunk
+        time.sleep(self.latency + self.chunk_delay * (len(self._chunks()) - 1))
+        return FakeResponse(self.text)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.calls += 1
+        self._check_quota()
+        await asyncio.sleep(self.latency + self.chunk_delay * (len(self._chunks()) - 1))
+        return FakeResponse(self.text)
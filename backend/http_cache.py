@@ -0,0 +1,113 @@
+"""HTTP caching for read endpoints.
+
+- CatalogueVersion: a counter in MongoDB bumped on every catalogue write
+  (product add/update/delete and stock changes), shared by all workers and
+  read through a short in-process TTL. Other data sets (varieties) keep
+  their own counter under a different name. Async views bump it with
+  bump_async() on the async MongoDB client.
+- ResponseCache: a bounded in-process LRU of already-serialized response
+  bodies, so a hit skips MongoDB and JSON encoding entirely.
+- cached_response: turns a cache entry into a Response with a strong ETag
+  and Cache-Control, answering 304 when If-None-Match matches.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, request
+from pymongo import ReturnDocument
+
+
+def make_etag(*parts):
+    return hashlib.sha1('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:24]
+
+
+class CatalogueVersion:
+    def __init__(self, get_collection, ttl=1.0, name='catalogue', get_async_collection=None):
+        self.get_collection = get_collection
+        self.get_async_collection = get_async_collection
+        self.name = name
+        self.ttl = ttl
+        self._value = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        if self._value is None or now >= self._expires:
+            doc = self.get_collection().find_one({'_id': self.name})
+            with self._lock:
+                self._value = doc['version'] if doc else 0
+                self._expires = now + self.ttl
+        return self._value
+
+    def bump(self):
+        return self._bumped(self.get_collection().find_one_and_update(
+            {'_id': self.name}, {'$inc': {'version': 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        ))
+
+    async def bump_async(self):
+        return self._bumped(await self.get_async_collection().find_one_and_update(
+            {'_id': self.name}, {'$inc': {'version': 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        ))
+
+    def _bumped(self, doc):
+        with self._lock:
+            # This worker sees its own write immediately; others within ttl
+            self._value = doc['version']
+            self._expires = time.monotonic() + self.ttl
+        return self._value
+
+
+class ResponseCache:
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, entry)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] is not None and item[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def put(self, key, body, etag, headers=None, ttl=None):
+        entry = {'body': body, 'etag': etag, 'headers': headers or {}}
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl if ttl else None, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def not_modified(etag, cache_control):
+    """A 304 for the given ETag if the client already has it, else None."""
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        return response
+    return None
+
+
+def cached_response(entry, cache_control):
+    response = not_modified(entry['etag'], cache_control)
+    if response is not None:
+        return response
+    response = Response(entry['body'], mimetype='application/json')
+    response.set_etag(entry['etag'])
+    response.headers['Cache-Control'] = cache_control
+    for name, value in entry['headers'].items():
+        response.headers[name] = value
+    return response
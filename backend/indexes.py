@@ -0,0 +1,128 @@
+"""MongoDB index declarations for the backend.
+
+`ensure_indexes` runs once when the server starts (see provision_indexes in
+app.py) and is safe to call repeatedly: create_index is a no-op when an
+identical index already exists. It is never called on a request.
+
+Create the indexes by hand, or print the query plan the server picks for
+each hot route query, with the Flask CLI:
+
+    flask --app app ensure-indexes            # create indexes
+    flask --app app ensure-indexes --explain  # create, then explain every route query
+"""
+import logging
+import sys
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import ConnectionFailure, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# collection name -> list of (keys, options)
+INDEXES = {
+    'users': [
+        ([('email', ASCENDING)], {'unique': True, 'name': 'email_unique'}),
+    ],
+    'cart': [
+        # One line per product; run `flask --app app migrate-cart` first on
+        # databases with duplicate lines from before POST /cart upserted
+        ([('user_id', ASCENDING), ('product_id', ASCENDING)], {'unique': True, 'name': 'user_product'}),
+    ],
+    'bookings': [
+        ([('user_id', ASCENDING), ('booking_date_time', ASCENDING)], {'name': 'user_booking_date'}),
+        ([('krishiBhavan', ASCENDING), ('collection_status', ASCENDING), ('booking_date_time', DESCENDING), ('_id', DESCENDING)],
+         {'name': 'krishiBhavan_status_date'}),
+        ([('krishiBhavan', ASCENDING), ('booking_date_time', DESCENDING), ('_id', DESCENDING)], {'name': 'krishiBhavan_date'}),
+    ],
+    'products': [
+        ([('category', ASCENDING), ('krishiBhavan', ASCENDING), ('_id', ASCENDING)], {'name': 'category_krishiBhavan_id'}),
+        ([('krishiBhavan', ASCENDING), ('_id', ASCENDING)], {'name': 'krishiBhavan_id'}),
+        ([('price_registered', ASCENDING), ('_id', ASCENDING)], {'name': 'price_registered_id'}),
+        ([('price_unregistered', ASCENDING), ('_id', ASCENDING)], {'name': 'price_unregistered_id'}),
+        ([('name', ASCENDING), ('_id', ASCENDING)], {'name': 'name_id'}),
+        ([('stock', ASCENDING), ('_id', ASCENDING)], {'name': 'stock_id'}),
+    ],
+    'varieties': [
+        ([('id', ASCENDING)], {'unique': True, 'name': 'id_unique'}),
+        ([('type', ASCENDING), ('id', ASCENDING)], {'name': 'type_id'}),
+    ],
+    'product_details_cache': [
+        ([('expires_at', ASCENDING)], {'expireAfterSeconds': 0, 'name': 'expires_at_ttl'}),
+    ],
+}
+
+
+# Indexes earlier versions created that ensure_indexes now drops
+RETIRED_INDEXES = {
+    # A prefix of krishiBhavan_status_date, which serves the same queries
+    'bookings': ['krishiBhavan_status'],
+}
+
+
+def ensure_indexes(db):
+    """Create every declared index and drop retired ones, logging (not raising) on conflicts.
+
+    A failure here usually means existing data violates a constraint, e.g.
+    duplicate user emails blocking the unique index; the app still starts.
+    An unreachable server is logged once and skipped the same way.
+    """
+    for collection_name, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                db[collection_name].create_index(keys, **options)
+            except OperationFailure as e:
+                logger.error("Failed to create index %s on %s: %s", options['name'], collection_name, e)
+            except ConnectionFailure as e:
+                logger.error("Skipping index creation, MongoDB is unreachable: %s", e)
+                return
+    for collection_name, index_names in RETIRED_INDEXES.items():
+        for index_name in index_names:
+            try:
+                if index_name in db[collection_name].index_information():
+                    db[collection_name].drop_index(index_name)
+                    logger.info("Dropped retired index %s on %s", index_name, collection_name)
+            except OperationFailure as e:
+                logger.error("Failed to drop index %s on %s: %s", index_name, collection_name, e)
+            except ConnectionFailure as e:
+                logger.error("Skipping index cleanup, MongoDB is unreachable: %s", e)
+                return
+
+
+def _sample(db, collection_name, field, default):
+    doc = db[collection_name].find_one({field: {'$exists': True}}, {field: 1})
+    return doc[field] if doc else default
+
+
+def route_queries(db):
+    """The hot (route, collection, filter) queries issued by app.py."""
+    user_oid = _sample(db, 'cart', 'user_id', ObjectId())
+    product_oid = _sample(db, 'cart', 'product_id', ObjectId())
+    booking_user = _sample(db, 'bookings', 'user_id', str(ObjectId()))
+    krishi_bhavan = _sample(db, 'products', 'krishiBhavan', 'Krishi Bhavan 1')
+    return [
+        ('POST /login', 'users', {'email': _sample(db, 'users', 'email', 'farmer@example.com')}),
+        ('GET /cart', 'cart', {'user_id': user_oid}),
+        ('PUT|DELETE /cart', 'cart', {'user_id': user_oid, 'product_id': product_oid}),
+        ('GET /bookings', 'bookings', {'user_id': booking_user}),
+        ('seller bookings', 'bookings', {'krishiBhavan': krishi_bhavan, 'collection_status': 'pending'}),
+        ('GET /products?category&krishiBhavan', 'products', {'category': 'Seeds', 'krishiBhavan': krishi_bhavan}),
+    ]
+
+
+def _walk(plan):
+    yield plan
+    for child in plan.get('inputStages', []) + ([plan['inputStage']] if 'inputStage' in plan else []):
+        yield from _walk(child)
+
+
+def explain_route_queries(db, out=sys.stdout):
+    for route, collection_name, query in route_queries(db):
+        explanation = db[collection_name].find(query).explain()
+        winning_plan = explanation['queryPlanner']['winningPlan']
+        # Newer servers nest the classic plan under queryPlan
+        winning_plan = winning_plan.get('queryPlan', winning_plan)
+        stages = [stage.get('stage') for stage in _walk(winning_plan)]
+        index_names = sorted({stage['indexName'] for stage in _walk(winning_plan) if 'indexName' in stage})
+        verdict = 'COLLSCAN' if 'COLLSCAN' in stages else 'index: ' + ', '.join(index_names)
+        print(f"{route:40} {collection_name:10} {' <- '.join(filter(None, stages)):30} {verdict}", file=out)
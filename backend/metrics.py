@@ -0,0 +1,221 @@
+"""In-process metrics with a Prometheus text endpoint.
+
+Tracks, per worker process:
+- request latency histograms per Flask endpoint, method and status
+- MongoDB commands and time, overall per command and per request (a pymongo
+  CommandListener attributes each command to the request whose context,
+  thread or event-loop task, issued it)
+- Gemini call latency, and product details served without AI text
+- product-details cache hits and misses
+
+GET /metrics renders everything in the Prometheus text format. Under a
+multi-process server each worker reports its own numbers, so scrape them
+per worker or aggregate with `sum()` in queries. With METRICS_DEBUG_HEADER
+enabled every response carries X-DB-Calls and X-DB-Time-ms for the request.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, current_app, g, has_app_context, request
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                     for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    labels = _format_labels(self.labels + ('le',), label_values + (bound,))
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = _format_labels(self.labels + ('le',), label_values + ('+Inf',))
+                lines.append(f'{self.name}_bucket{labels} {series[-1]}')
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f'{self.name}_sum{labels} {series[-2]}')
+                lines.append(f'{self.name}_count{labels} {series[-1]}')
+        return lines
+
+
+class Gauge:
+    """A value read from a callback at scrape time."""
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def render(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge', f'{self.name} {self.read()}']
+
+
+def _cache():
+    """The product-details DescriptionCache of the app serving /metrics."""
+    return current_app.extensions.get('description_cache') if has_app_context() else None
+
+
+def _cache_hit_ratio():
+    cache = _cache()
+    lookups = cache.hits + cache.misses if cache else 0
+    return cache.hits / lookups if lookups else 0
+
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request latency by endpoint.',
+                            ('endpoint', 'method', 'status'))
+REQUEST_DB_CALLS = Histogram('http_request_db_calls', 'MongoDB commands issued per request.', ('endpoint',),
+                             buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, 250))
+DB_COMMANDS = Counter('mongodb_commands_total', 'MongoDB commands by command name and outcome.',
+                      ('command', 'outcome'))
+DB_COMMAND_LATENCY = Histogram('mongodb_command_duration_seconds', 'MongoDB command latency.', ('command',))
+GEMINI_LATENCY = Histogram('gemini_request_duration_seconds', 'Gemini generate_content latency.',
+                           ('mode', 'outcome'), buckets=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0))
+GEMINI_FALLBACKS = Counter('gemini_fallbacks_total', 'Product details served with the static description.',
+                           ('reason',))
+CACHE_HITS = Gauge('product_details_cache_hits', 'Product-details cache hits.', lambda: _cache().hits if _cache() else 0)
+CACHE_MISSES = Gauge('product_details_cache_misses', 'Product-details cache misses.',
+                     lambda: _cache().misses if _cache() else 0)
+CACHE_HIT_RATIO = Gauge('product_details_cache_hit_ratio', 'Product-details cache hit ratio.',
+                        _cache_hit_ratio)
+REGISTRY = [REQUEST_LATENCY, REQUEST_DB_CALLS, DB_COMMANDS, DB_COMMAND_LATENCY, GEMINI_LATENCY, GEMINI_FALLBACKS,
+            CACHE_HITS, CACHE_MISSES, CACHE_HIT_RATIO]
+
+# A context variable rather than a thread-local: async views run on the
+# event loop thread, in a copy of the request thread's context
+_request_stats = contextvars.ContextVar('request_stats', default=None)
+
+
+def count_db_call(seconds=0.0):
+    """Attribute one database round trip to the request running in this context."""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats['calls'] += 1
+        stats['seconds'] += seconds
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Counts MongoDB commands globally and for the request that ran them.
+
+    pymongo calls listeners synchronously from the code that ran the
+    command, so its context tells which request that was.
+    """
+
+    def started(self, event):
+        pass
+
+    def _record(self, event, outcome):
+        seconds = event.duration_micros / 1e6
+        DB_COMMANDS.inc(event.command_name, outcome)
+        DB_COMMAND_LATENCY.observe(seconds, event.command_name)
+        count_db_call(seconds)
+
+    def succeeded(self, event):
+        self._record(event, 'success')
+
+    def failed(self, event):
+        self._record(event, 'failure')
+
+
+COMMAND_LISTENER = CommandMetricsListener()
+
+
+@contextmanager
+def time_gemini(mode):
+    """Time a Gemini call (mode is 'full' or 'stream')."""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'success'
+    finally:
+        GEMINI_LATENCY.observe(time.perf_counter() - start, mode, outcome)
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app, mongo):
+    """Install request timing hooks, the MongoDB listener and GET /metrics."""
+    mongo.add_event_listener(COMMAND_LISTENER)
+    debug_header = app.config.get('METRICS_DEBUG_HEADER')
+
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        _request_stats.set({'calls': 0, 'seconds': 0.0})
+
+    @app.after_request
+    def _finish_request_metrics(response):
+        endpoint = request.endpoint or 'unmatched'
+        stats = _request_stats.get() or {'calls': 0, 'seconds': 0.0}
+        REQUEST_LATENCY.observe(time.perf_counter() - g.get('metrics_started', time.perf_counter()),
+                                endpoint, request.method, response.status_code)
+        REQUEST_DB_CALLS.observe(stats['calls'], endpoint)
+        if debug_header:
+            response.headers['X-DB-Calls'] = str(stats['calls'])
+            response.headers['X-DB-Time-ms'] = f"{stats['seconds'] * 1000:.2f}"
+        return response
+
+    @app.teardown_request
+    def _clear_request_metrics(exc):
+        _request_stats.set(None)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(render(), mimetype='text/plain; version=0.0.4')
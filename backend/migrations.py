@@ -0,0 +1,93 @@
+"""One-off data migrations.
+
+Run through the Flask CLI, e.g. `flask --app app migrate-bookings`.
+"""
+import logging
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+def parse_datetime(value):
+    """Parse an ISO-8601 string (the frontend sends toISOString()) as UTC."""
+    parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _to_int(value):
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(f'non-integer quantity {value!r}')
+    return int(number)
+
+
+def migrate_booking_types(db, batch_size=500):
+    """Convert bookings stored with client-sent strings to typed fields.
+
+    booking_date_time becomes a BSON date, total_amount a double and
+    quantity an int. Documents that can't be converted are logged and left
+    alone. Safe to re-run; returns (converted, skipped).
+    """
+    untyped = {'$or': [
+        {'booking_date_time': {'$type': 'string'}},
+        {'total_amount': {'$type': 'string'}},
+        {'quantity': {'$type': 'string'}},
+        {'quantity': {'$type': 'double'}},
+    ]}
+    converted = skipped = 0
+    batch = []
+    for booking in db.bookings.find(untyped, {'booking_date_time': 1, 'total_amount': 1, 'quantity': 1}):
+        try:
+            update = {}
+            if isinstance(booking.get('booking_date_time'), str):
+                update['booking_date_time'] = parse_datetime(booking['booking_date_time'])
+            if isinstance(booking.get('total_amount'), str):
+                update['total_amount'] = float(booking['total_amount'])
+            if isinstance(booking.get('quantity'), (str, float)):
+                update['quantity'] = _to_int(booking['quantity'])
+        except (TypeError, ValueError) as e:
+            logger.error("Skipping booking %s: %s", booking['_id'], e)
+            skipped += 1
+            continue
+
+        batch.append(UpdateOne({'_id': booking['_id']}, {'$set': update}))
+        if len(batch) >= batch_size:
+            converted += db.bookings.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        converted += db.bookings.bulk_write(batch, ordered=False).modified_count
+    return converted, skipped
+
+
+def merge_duplicate_cart_lines(db):
+    """Fold duplicate (user_id, product_id) cart rows into one.
+
+    POST /cart used to insert a new row each time a product was added. The
+    first row of each group keeps the summed quantity and the rest are
+    deleted. A non-unique user_product index left from before is then
+    dropped so ensure_indexes can rebuild it as unique. Safe to re-run;
+    returns the number of rows removed.
+    """
+    removed = 0
+    duplicates = db.cart.aggregate([
+        {'$group': {
+            '_id': {'user_id': '$user_id', 'product_id': '$product_id'},
+            'ids': {'$push': '$_id'},
+            'quantity': {'$sum': '$quantity'},
+            'count': {'$sum': 1},
+        }},
+        {'$match': {'count': {'$gt': 1}}},
+    ], allowDiskUse=True)
+    for group in duplicates:
+        keep, *extra = group['ids']
+        db.cart.update_one({'_id': keep}, {'$set': {'quantity': group['quantity']}})
+        removed += db.cart.delete_many({'_id': {'$in': extra}}).deleted_count
+
+    index = db.cart.index_information().get('user_product')
+    if index is not None and not index.get('unique'):
+        db.cart.drop_index('user_product')
+    return removed
@@ -0,0 +1,313 @@
+"""Admission control in front of the Gemini model.
+
+Every generate_content call in the app goes through a ModelGateway, which
+gives:
+- a token bucket capping how fast calls start (our API quota),
+- a semaphore capping how many run at once, so a crawler walking every
+  product id can't tie up all web threads waiting on Gemini,
+- a per-call timeout,
+- coalescing: concurrent requests for the same prompt share one call,
+- a cooldown after a quota (429) error: no new calls start until it ends.
+
+When a call can't be admitted in time, times out or hits the quota, the
+gateway raises a GatewayError. Callers then fall back to the static
+description and don't cache the result.
+
+generate_async() is the same for async views: the model's
+generate_content_async is awaited on the event loop instead of occupying
+an executor thread, under the same bucket, slots and timeout.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+
+class GatewayError(Exception):
+    """The model could not be called or did not answer in time."""
+
+
+class GatewayBusy(GatewayError):
+    """Rate limited, out of slots or cooling down after a quota error."""
+
+
+class GatewayTimeout(GatewayError):
+    pass
+
+
+def is_quota_error(error):
+    # google.api_core's ResourceExhausted and the fake model's quota error both carry code 429
+    return getattr(error, 'code', None) == 429
+
+
+class TokenBucket:
+    """`rate` calls per second on average, bursts of up to `burst`. rate <= 0 means unlimited."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self):
+        """Take a token, returning 0, or the seconds until one is available."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout):
+        if self.rate <= 0:
+            return True
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, timeout):
+        """acquire() that sleeps on the event loop instead of blocking it."""
+        if self.rate <= 0:
+            return True
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """Hand out nothing for `seconds` (e.g. after the API reported quota exhaustion)."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class _Stream:
+    """Chunk texts of a streamed response; frees its slot exactly once when done or closed."""
+
+    def __init__(self, response, release, timer):
+        self._chunks = iter(response)
+        self._release = release
+        self._timer = timer
+        self._timer.__enter__()
+        self._open = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._chunks).text
+        except StopIteration:
+            self.close()
+            raise
+        except BaseException as e:
+            self.close(e)
+            raise
+
+    def close(self, error=None):
+        if self._open:
+            self._open = False
+            self._release()
+            if error is None:
+                self._timer.__exit__(None, None, None)
+            else:
+                try:
+                    self._timer.__exit__(type(error), error, error.__traceback__)
+                except BaseException:
+                    pass
+
+    def __del__(self):
+        self.close()
+
+
+class ModelGateway:
+    def __init__(self, model, max_concurrency=4, rate=1.0, burst=5, timeout=20.0, queue_timeout=2.0,
+                 quota_cooldown=30.0, timer=None):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.quota_cooldown = quota_cooldown
+        self.timer = timer or (lambda mode: nullcontext())
+        self.bucket = TokenBucket(rate, burst)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='gemini')
+        self._inflight = {}  # prompt -> {'done': Event, 'value': text, 'error': exception}
+        self._inflight_async = {}  # prompt -> asyncio.Future, on the app's event loop
+        self._lock = threading.Lock()
+
+    def _admit(self, wait):
+        wait = self.queue_timeout if wait is None else wait
+        if not self.bucket.acquire(wait):
+            raise GatewayBusy('Gemini rate limit reached')
+        if not self._slots.acquire(timeout=wait):
+            raise GatewayBusy('All Gemini slots are busy')
+
+    async def _admit_async(self, wait):
+        wait = self.queue_timeout if wait is None else wait
+        deadline = time.monotonic() + wait
+        if not await self.bucket.acquire_async(wait):
+            raise GatewayBusy('Gemini rate limit reached')
+        # The slots are shared with threads calling generate() and stream(),
+        # so poll the semaphore rather than block the loop on it
+        while not self._slots.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                raise GatewayBusy('All Gemini slots are busy')
+            await asyncio.sleep(0.01)
+
+    def _quota_exceeded(self, error):
+        logger.warning("Gemini quota exhausted (%s); pausing calls for %ss", error, self.quota_cooldown)
+        self.bucket.pause(self.quota_cooldown)
+        return GatewayBusy('Gemini quota exhausted')
+
+    def _invoke(self, prompt):
+        with self.timer('full'):
+            return self.model.generate_content(prompt, request_options={'timeout': self.timeout}).text
+
+    def _call(self, prompt, wait):
+        self._admit(wait)
+        try:
+            future = self._executor.submit(self._invoke, prompt)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is held until the call really ends, even if we stop waiting for it
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise GatewayTimeout(f'Gemini did not answer within {self.timeout}s')
+        except Exception as e:
+            if is_quota_error(e):
+                raise self._quota_exceeded(e) from e
+            raise
+
+    def generate(self, prompt, wait=None):
+        """Generated text for `prompt`; identical concurrent prompts share one call.
+
+        `wait` overrides how long to queue for a token and a slot.
+        """
+        with self._lock:
+            flight = self._inflight.get(prompt)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[prompt] = {'done': threading.Event(), 'value': None, 'error': None}
+
+        if not leader:
+            if not flight['done'].wait(self.timeout + (self.queue_timeout if wait is None else wait)):
+                raise GatewayTimeout(f'Gemini did not answer within {self.timeout}s')
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['value']
+
+        try:
+            flight['value'] = self._call(prompt, wait)
+            return flight['value']
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[prompt]
+            flight['done'].set()
+
+    async def _call_async(self, prompt, wait):
+        await self._admit_async(wait)
+        try:
+            with self.timer('full'):
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, request_options={'timeout': self.timeout}),
+                    self.timeout
+                )
+            return response.text
+        except asyncio.TimeoutError:
+            raise GatewayTimeout(f'Gemini did not answer within {self.timeout}s')
+        except Exception as e:
+            if is_quota_error(e):
+                raise self._quota_exceeded(e) from e
+            raise
+        finally:
+            # wait_for cancels a call that timed out, so it has ended here
+            self._slots.release()
+
+    async def generate_async(self, prompt, wait=None):
+        """generate() for coroutines running on the app's event loop."""
+        flight = self._inflight_async.get(prompt)
+        if flight is not None:
+            # shield: a waiter timing out must not cancel the leader's call
+            try:
+                return await asyncio.wait_for(asyncio.shield(flight),
+                                              self.timeout + (self.queue_timeout if wait is None else wait))
+            except asyncio.TimeoutError:
+                raise GatewayTimeout(f'Gemini did not answer within {self.timeout}s')
+
+        flight = self._inflight_async[prompt] = asyncio.get_running_loop().create_future()
+        try:
+            value = await self._call_async(prompt, wait)
+            flight.set_result(value)
+            return value
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        except asyncio.CancelledError:
+            flight.set_exception(GatewayError('Gemini call was cancelled'))
+            raise
+        finally:
+            if flight.done() and not flight.cancelled():
+                flight.exception()  # mark retrieved; there may be no waiters
+            del self._inflight_async[prompt]
+
+    def stream(self, prompt):
+        """Iterate the text chunks of a streamed generation.
+
+        Admission happens here, before the first chunk, so a busy gateway
+        raises GatewayBusy straight away. The slot is released when the
+        iterator is exhausted or closed.
+        """
+        self._admit(None)
+        try:
+            response = self.model.generate_content(prompt, stream=True, request_options={'timeout': self.timeout})
+        except Exception as e:
+            self._slots.release()
+            if is_quota_error(e):
+                raise self._quota_exceeded(e) from e
+            raise
+        return _Stream(response, self._slots.release, self.timer('stream'))
+
+    def pre_generate(self, prompts, wait=3600):
+        """Generate many prompts at the gateway's concurrency and rate.
+
+        Returns {prompt: text or the exception raised for it}. Calls queue
+        for up to `wait` seconds each rather than failing fast like requests do.
+        """
+        results = {}
+
+        def run(prompt):
+            try:
+                results[prompt] = self.generate(prompt, wait=wait)
+            except Exception as e:
+                results[prompt] = e
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='gemini-batch') as pool:
+            list(pool.map(run, list(dict.fromkeys(prompts))))
+        return results
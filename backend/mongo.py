@@ -0,0 +1,150 @@
+"""Lazily created, fork-safe MongoDB client.
+
+Nothing connects at import time. The client is built on first use in each
+process from the app config, and rebuilt if the process has forked since
+(pymongo clients must not be shared across fork()), so the app is safe to
+load in a pre-fork server master. Creating the client never touches the
+server; indexes are provisioned at startup (see indexes.py), not here.
+
+Async views use `async_client` / `async_db` instead: PyMongo's native
+AsyncMongoClient (pymongo 4.13+), built the same way on the app's event
+loop (see aio.py) and only ever used from it.
+"""
+import asyncio
+import logging
+import os
+import threading
+
+from pymongo import MongoClient, ReadPreference
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:  # pymongo < 4.13; only the async views need it
+    AsyncMongoClient = None
+
+logger = logging.getLogger(__name__)
+
+READ_PREFERENCES = {
+    'primary': ReadPreference.PRIMARY,
+    'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+    'secondary': ReadPreference.SECONDARY,
+    'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+    'nearest': ReadPreference.NEAREST,
+}
+
+
+class Mongo:
+    def __init__(self, app=None):
+        self.config = {}
+        self._client = None
+        self._pid = None
+        self._async_client = None
+        self._async_pid = None
+        self._async_loop = None
+        self._lock = threading.Lock()
+        self.event_listeners = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.config = {key: value for key, value in app.config.items() if key.startswith('MONGO_')}
+        self.close()
+        app.extensions['mongo'] = self
+
+    def add_event_listener(self, listener):
+        """Attach a pymongo monitoring listener to clients created from now on."""
+        if listener not in self.event_listeners:
+            self.event_listeners.append(listener)
+        # Rebuild on next use so the listener sees every command
+        self.close()
+
+    def _client_kwargs(self):
+        options = {
+            'maxPoolSize': self.config.get('MONGO_MAX_POOL_SIZE'),
+            'minPoolSize': self.config.get('MONGO_MIN_POOL_SIZE'),
+            'maxIdleTimeMS': self.config.get('MONGO_MAX_IDLE_TIME_MS'),
+            'waitQueueTimeoutMS': self.config.get('MONGO_WAIT_QUEUE_TIMEOUT_MS'),
+            'serverSelectionTimeoutMS': self.config.get('MONGO_SERVER_SELECTION_TIMEOUT_MS'),
+            'connectTimeoutMS': self.config.get('MONGO_CONNECT_TIMEOUT_MS'),
+            'socketTimeoutMS': self.config.get('MONGO_SOCKET_TIMEOUT_MS'),
+            'readPreference': self.config.get('MONGO_READ_PREFERENCE'),
+            'readConcernLevel': self.config.get('MONGO_READ_CONCERN'),
+            'w': self.config.get('MONGO_WRITE_CONCERN_W'),
+            'journal': self.config.get('MONGO_WRITE_CONCERN_J'),
+        }
+        if options['w'] and str(options['w']).isdigit():
+            options['w'] = int(options['w'])
+        if options['journal'] is not None:
+            options['journal'] = str(options['journal']).lower() in ('1', 'true', 'yes')
+        options['event_listeners'] = list(self.event_listeners) or None
+        return {key: value for key, value in options.items() if value is not None}
+
+    @property
+    def client(self):
+        pid = os.getpid()
+        if self._client is None or self._pid != pid:
+            with self._lock:
+                if self._client is None or self._pid != pid:
+                    # A client inherited across fork() is unusable; drop it
+                    # without closing, which would touch the parent's sockets.
+                    self._client = MongoClient(self.config.get('MONGO_URI'), **self._client_kwargs())
+                    self._pid = pid
+                    logger.info("Created MongoDB client for pid %s", pid)
+        return self._client
+
+    @property
+    def async_client(self):
+        """The AsyncMongoClient, created on first use from the running event loop.
+
+        It belongs to that loop, so only use it from coroutines running on
+        the app's event loop.
+        """
+        pid = os.getpid()
+        if self._async_client is None or self._async_pid != pid:
+            loop = asyncio.get_running_loop()
+            with self._lock:
+                if self._async_client is None or self._async_pid != pid:
+                    if AsyncMongoClient is None:
+                        raise RuntimeError('Async views need pymongo 4.13 or newer (AsyncMongoClient)')
+                    self._async_client = AsyncMongoClient(self.config.get('MONGO_URI'), **self._client_kwargs())
+                    self._async_pid = pid
+                    self._async_loop = loop
+                    logger.info("Created async MongoDB client for pid %s", pid)
+        return self._async_client
+
+    @property
+    def db(self):
+        return self.client[self.config.get('MONGO_DB_NAME', 'mydatabase')]
+
+    @property
+    def async_db(self):
+        return self.async_client[self.config.get('MONGO_DB_NAME', 'mydatabase')]
+
+    def _secondary(self, client):
+        preference = self.config.get('MONGO_SECONDARY_READ_PREFERENCE', 'secondaryPreferred')
+        return client.get_database(
+            self.config.get('MONGO_DB_NAME', 'mydatabase'),
+            read_preference=READ_PREFERENCES[preference]
+        )
+
+    @property
+    def secondary_db(self):
+        """The database handle for reads that may be served by secondaries."""
+        return self._secondary(self.client)
+
+    @property
+    def async_secondary_db(self):
+        return self._secondary(self.async_client)
+
+    def close(self):
+        if self._client is not None and self._pid == os.getpid():
+            self._client.close()
+        self._client = None
+        self._pid = None
+        client, loop = self._async_client, self._async_loop
+        if client is not None and self._async_pid == os.getpid() and loop.is_running():
+            # AsyncMongoClient.close() is a coroutine; let its own loop run it
+            asyncio.run_coroutine_threadsafe(client.close(), loop)
+        self._async_client = None
+        self._async_pid = None
+        self._async_loop = None
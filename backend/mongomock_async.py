@@ -0,0 +1,103 @@
+"""In-memory AsyncMongoClient stand-in built on mongomock.
+
+mongomock only has a synchronous client. This wraps it in the subset of
+PyMongo's async API the app uses (awaitable collection methods, find()
+returning a cursor with to_list() and `async for`, awaitable close()) so
+the async views can run without a mongod, for bench_suite --mongomock and
+the tests:
+
+    MongoClient, AsyncMongoClient = mongomock_async.client_classes()
+
+returns a sync and an async client class sharing one in-memory server, to
+patch into mongo.py. Transactions are not supported (mongomock has no
+sessions), so leave MONGO_TRANSACTIONS off.
+"""
+import functools
+import itertools
+
+import mongomock
+from mongomock.store import ServerStore
+
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor.sort(*args, **kwargs)
+        return self
+
+    def skip(self, count):
+        self._cursor.skip(count)
+        return self
+
+    def limit(self, count):
+        self._cursor.limit(count)
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._cursor)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        return list(itertools.islice(self._cursor, length))
+
+
+class AsyncCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, *args, **kwargs):
+        return AsyncCursor(self._collection.aggregate(*args, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+class AsyncDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name):
+        return AsyncCollection(self._database[name])
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+
+class AsyncMongoClient:
+    def __init__(self, host=None, _store=None, **kwargs):
+        self._client = mongomock.MongoClient(host, _store=_store, **kwargs)
+
+    def __getitem__(self, name):
+        return AsyncDatabase(self._client[name])
+
+    def get_database(self, name, **kwargs):
+        return AsyncDatabase(self._client.get_database(name, **kwargs))
+
+    def start_session(self, **kwargs):
+        raise NotImplementedError('mongomock has no sessions; leave MONGO_TRANSACTIONS off')
+
+    async def close(self):
+        self._client.close()
+
+
+def client_classes():
+    """(MongoClient, AsyncMongoClient) stand-ins that share one in-memory server."""
+    store = ServerStore()
+    return (functools.partial(mongomock.MongoClient, _store=store),
+            functools.partial(AsyncMongoClient, _store=store))
@@ -0,0 +1,105 @@
+"""Bounded worker pool for bcrypt hashing and verification.
+
+bcrypt costs hundreds of milliseconds of CPU per call. Running it inline lets
+a burst of logins starve every other route, so all hashing goes through a
+small dedicated pool instead. bcrypt releases the GIL while hashing, so
+threads give real parallelism without the cost of a process pool.
+
+Each app gets its own pool, set up by init_passwords from these settings
+(see config.py):
+    BCRYPT_ROUNDS      work factor for new hashes (default 12)
+    AUTH_POOL_WORKERS  concurrent hashing threads (default 2)
+    AUTH_QUEUE_DEPTH   jobs allowed in flight or waiting before callers are
+                       turned away with AuthPoolFull (default 32)
+    AUTH_TIMEOUT       seconds to wait for a queued job (default 10)
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+
+class AuthPoolFull(Exception):
+    """Raised when the hashing queue is at capacity or a job timed out."""
+
+
+def _to_bytes(value):
+    return value.encode('utf-8') if isinstance(value, str) else value
+
+
+class PasswordHasher:
+    def __init__(self, rounds=12, workers=2, queue_depth=32, timeout=10):
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(queue_depth)
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise AuthPoolFull()
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run(self, fn, *args):
+        try:
+            return self._submit(fn, *args).result(timeout=self.timeout)
+        except FutureTimeout:
+            raise AuthPoolFull()
+
+    def _hash(self, password):
+        return bcrypt.hashpw(_to_bytes(password), bcrypt.gensalt(rounds=self.rounds))
+
+    @staticmethod
+    def _check(password, hashed):
+        return bcrypt.checkpw(_to_bytes(password), _to_bytes(hashed))
+
+    def hash(self, password):
+        """Hash a password on the pool, blocking until done."""
+        return self._run(self._hash, password)
+
+    def check(self, password, hashed):
+        """Verify a password against its bcrypt hash on the pool."""
+        return self._run(self._check, password, hashed)
+
+    def needs_rehash(self, hashed):
+        """True if the hash was made with a lower work factor than configured."""
+        # bcrypt hashes look like $2b$12$<salt+hash>
+        try:
+            return int(_to_bytes(hashed).split(b'$')[2]) < self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def rehash_in_background(self, password, on_done):
+        """Hash `password` at the current work factor and pass it to `on_done`.
+
+        Used to upgrade old hashes after a successful login without making the
+        caller wait. `on_done` runs on a pool thread, outside the app context.
+        Silently skipped when the pool is busy; the next login will try again.
+        """
+        def _job():
+            try:
+                on_done(self._hash(password))
+            except Exception:
+                logger.exception("Background password rehash failed")
+
+        try:
+            self._submit(_job)
+        except AuthPoolFull:
+            logger.info("Skipping password rehash: auth pool is busy")
+
+
+def init_passwords(app):
+    app.extensions['passwords'] = PasswordHasher(
+        rounds=app.config['BCRYPT_ROUNDS'],
+        workers=app.config['AUTH_POOL_WORKERS'],
+        queue_depth=app.config['AUTH_QUEUE_DEPTH'],
+        timeout=app.config['AUTH_TIMEOUT']
+    )
@@ -0,0 +1,190 @@
+"""Non-blocking, structured request logging.
+
+Log calls on the request path only merge the message with its (redacted)
+arguments, render any traceback to text and enqueue the record; JSON
+encoding and I/O happen on a background QueueListener thread.
+Records are JSON objects carrying the request id and endpoint, plus any
+structured `fields` passed via `extra={'fields': {...}}`.
+
+Each request also produces one access record (method, path, status,
+duration). Access records can be sampled per endpoint with LOG_SAMPLE_RATES;
+errors (status >= 400) are always kept.
+
+Settings (app config / environment):
+    LOG_LEVEL          default INFO
+    LOG_FORMAT         json (default) or text
+    LOG_SAMPLE_RATES   "endpoint=rate,..." e.g. "api.get_products=0.1"
+    LOG_REDACT_FIELDS  comma-separated keys masked wherever they appear
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+REDACTED = '[REDACTED]'
+
+_listener = None
+access_logger = logging.getLogger('access')
+
+
+def parse_sample_rates(value):
+    rates = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        endpoint, _, rate = item.partition('=')
+        rates[endpoint.strip()] = float(rate)
+    return rates
+
+
+def redact(value, fields):
+    if isinstance(value, dict):
+        return {k: REDACTED if k.lower() in fields else redact(v, fields) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v, fields) for v in value]
+    return value
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the request id and endpoint while still on the request thread."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = getattr(g, 'request_id', None)
+            record.endpoint = request.endpoint
+        return True
+
+
+class NonFormattingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves the formatter (JSON encoding) to the listener thread.
+
+    prepare() does only what must happen on the calling thread, as the
+    stock one does: the message is merged with its args, so objects mutated
+    after the call can't change what is logged, and a traceback is rendered
+    to exc_text, so its frames aren't kept alive in the queue. Args are
+    redacted before merging since the formatter no longer sees them.
+    """
+
+    def __init__(self, queue, redact_fields=()):
+        super().__init__(queue)
+        self.redact_fields = {field.lower() for field in redact_fields}
+        self._exc_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        if isinstance(record.args, dict):
+            record.args = redact(record.args, self.redact_fields)
+        elif record.args:
+            record.args = tuple(redact(arg, self.redact_fields) for arg in record.args)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, redact_fields=()):
+        super().__init__()
+        self.redact_fields = {field.lower() for field in redact_fields}
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for attr in ('request_id', 'endpoint'):
+            if getattr(record, attr, None):
+                entry[attr] = getattr(record, attr)
+        if getattr(record, 'fields', None):
+            entry.update(redact(record.fields, self.redact_fields))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(config, stream=None):
+    """Route all logging through a queue to a background writer thread.
+
+    Safe to call more than once (e.g. one create_app per test); the previous
+    listener is flushed and replaced.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    if config.get('LOG_FORMAT', 'json') == 'json':
+        formatter = JsonFormatter(config.get('LOG_REDACT_FIELDS', ()))
+    else:
+        formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s')
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    handler = NonFormattingQueueHandler(log_queue, config.get('LOG_REDACT_FIELDS', ()))
+    handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(config.get('LOG_LEVEL', 'INFO'))
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def _restart_listener_in_child():
+    # The listener thread doesn't survive fork() (e.g. gunicorn preload), so
+    # each worker needs its own or queued records would never be written
+    if _listener is not None:
+        _listener._thread = None
+        _listener.start()
+
+
+atexit.register(_stop_listener)
+os.register_at_fork(after_in_child=_restart_listener_in_child)
+
+
+def init_request_logging(app):
+    """Assign request ids and emit one (sampled) access record per request."""
+    sample_rates = parse_sample_rates(app.config.get('LOG_SAMPLE_RATES'))
+
+    @app.before_request
+    def _start_request_log():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _finish_request_log(response):
+        rate = sample_rates.get(request.endpoint, 1.0)
+        if response.status_code >= 400 or rate >= 1.0 or random.random() < rate:
+            access_logger.info("%s %s %s", request.method, request.path, response.status_code, extra={'fields': {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - g.get('request_started', time.perf_counter())) * 1000, 2),
+                'sample_rate': rate,
+            }})
+        response.headers['X-Request-ID'] = g.get('request_id', '')
+        return response
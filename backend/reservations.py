@@ -0,0 +1,275 @@
+"""Atomic stock reservation for bookings.
+
+Stock is decremented with a conditional find_one_and_update
+(`stock >= quantity`), so two concurrent bookings can never both take the
+last units. The booking insert then either runs in the same transaction
+(when the deployment supports them, see MONGO_TRANSACTIONS) or, on a
+standalone server, is paired with a compensating increment if it fails.
+
+book_items_async() is the same for async views, with every round trip
+awaited on PyMongo's AsyncMongoClient.
+
+Bookings created this way carry `stock_reserved: True`. Cancelling or
+expiring one returns its stock and clears the flag; bookings made before
+reservations existed never took stock, so they get nothing back.
+"""
+import logging
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationError(Exception):
+    def __init__(self, message, product_ids):
+        super().__init__(message)
+        self.product_ids = [str(product_id) for product_id in product_ids]
+
+
+class ProductNotFound(ReservationError):
+    pass
+
+
+class OutOfStock(ReservationError):
+    pass
+
+
+class InvalidQuantity(ReservationError):
+    pass
+
+
+def reserve_stock(db, product_id, quantity, session=None):
+    """Take `quantity` units of stock, returning the updated product.
+
+    Raises OutOfStock, ProductNotFound or InvalidQuantity; stock is
+    untouched in that case.
+    """
+    _check_quantity(product_id, quantity)
+    product = db.products.find_one_and_update(
+        {'_id': product_id, 'stock': {'$gte': quantity}},
+        {'$inc': {'stock': -quantity}},
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+    if product is not None:
+        return product
+    # Only the failure path pays for a second read to explain itself
+    _raise_not_reserved(product_id, db.products.count_documents({'_id': product_id}, limit=1, session=session))
+
+
+async def reserve_stock_async(db, product_id, quantity, session=None):
+    """reserve_stock() on an AsyncMongoClient database."""
+    _check_quantity(product_id, quantity)
+    product = await db.products.find_one_and_update(
+        {'_id': product_id, 'stock': {'$gte': quantity}},
+        {'$inc': {'stock': -quantity}},
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+    if product is not None:
+        return product
+    _raise_not_reserved(product_id,
+                        await db.products.count_documents({'_id': product_id}, limit=1, session=session))
+
+
+def _check_quantity(product_id, quantity):
+    # A zero or negative quantity would match any stock level and add to it
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+        raise InvalidQuantity(f'Invalid quantity {quantity!r} for product {product_id}', [product_id])
+
+
+def _raise_not_reserved(product_id, exists):
+    if exists:
+        raise OutOfStock(f'Not enough stock for product {product_id}', [product_id])
+    raise ProductNotFound(f'Product {product_id} not found', [product_id])
+
+
+def release_stock(db, product_id, quantity, session=None):
+    """Give back previously reserved stock."""
+    db.products.update_one({'_id': product_id}, {'$inc': {'stock': quantity}}, session=session)
+
+
+async def release_stock_async(db, product_id, quantity, session=None):
+    await db.products.update_one({'_id': product_id}, {'$inc': {'stock': quantity}}, session=session)
+
+
+def _book_items(db, items, make_booking, session=None):
+    """Reserve every (product_id, quantity) and insert one booking per item.
+
+    Without a session, anything already reserved is released again if a
+    later item or the insert fails.
+    """
+    reserved = []
+    try:
+        bookings = []
+        for product_id, quantity in items:
+            product = reserve_stock(db, product_id, quantity, session=session)
+            reserved.append((product_id, quantity))
+            bookings.append(make_booking(product, quantity))
+        db.bookings.insert_many(bookings, session=session)
+        return bookings
+    except Exception:
+        if session is None:
+            for product_id, quantity in reserved:
+                try:
+                    release_stock(db, product_id, quantity)
+                except Exception:
+                    logger.exception("Failed to release %s units of product %s", quantity, product_id)
+        raise
+
+
+def book_items(client, db, items, make_booking, use_transactions=False):
+    """Atomically reserve stock and create bookings for a list of items.
+
+    `items` is a list of (product ObjectId, quantity); `make_booking(product,
+    quantity)` builds the booking document from the updated product. Either
+    every item is booked or none is.
+    """
+    # Reserve in a stable order so concurrent multi-item checkouts can't
+    # deadlock each other inside transactions
+    items = sorted(items, key=lambda item: item[0])
+    if not use_transactions:
+        return _book_items(db, items, make_booking)
+    with client.start_session() as session:
+        return session.with_transaction(lambda s: _book_items(db, items, make_booking, session=s))
+
+
+async def _book_items_async(db, items, make_booking, session=None):
+    reserved = []
+    try:
+        bookings = []
+        for product_id, quantity in items:
+            product = await reserve_stock_async(db, product_id, quantity, session=session)
+            reserved.append((product_id, quantity))
+            bookings.append(make_booking(product, quantity))
+        await db.bookings.insert_many(bookings, session=session)
+        return bookings
+    except Exception:
+        if session is None:
+            for product_id, quantity in reserved:
+                try:
+                    await release_stock_async(db, product_id, quantity)
+                except Exception:
+                    logger.exception("Failed to release %s units of product %s", quantity, product_id)
+        raise
+
+
+async def book_items_async(client, db, items, make_booking, use_transactions=False):
+    """book_items() on an AsyncMongoClient: the same all-or-nothing booking."""
+    items = sorted(items, key=lambda item: item[0])
+    if not use_transactions:
+        return await _book_items_async(db, items, make_booking)
+    async with client.start_session() as session:
+        return await session.with_transaction(lambda s: _book_items_async(db, items, make_booking, session=s))
+
+
+def to_object_id(product_id):
+    if not ObjectId.is_valid(product_id):
+        raise ProductNotFound(f'Invalid product ID {product_id}', [product_id])
+    return ObjectId(product_id)
+
+
+# Allowed collection_status transitions. Only pending and confirmed
+# bookings hold stock, so moving to cancelled or expired (uncollected items
+# go back on the shelf) returns it.
+STATUS_TRANSITIONS = {
+    'pending': {'confirmed', 'collected', 'cancelled', 'expired'},
+    'confirmed': {'collected', 'cancelled', 'expired'},
+    'collected': set(),
+    'cancelled': set(),
+    'expired': set(),
+}
+RELEASES_STOCK = {'cancelled', 'expired'}
+
+
+def _return_stock(db, booking, token, session=None):
+    """Give back the stock a booking that this transition moved was holding.
+
+    Clearing stock_reserved first (guarded by the transition token) means
+    the units are returned at most once, however often this runs. Without a
+    session the booking and product writes are separate: if the product
+    update fails the flag is restored and the error logged, and only that
+    booking is affected. Full atomicity needs MONGO_TRANSACTIONS.
+    """
+    product_id = booking.get('product_id')
+    if isinstance(product_id, str) and ObjectId.is_valid(product_id):
+        product_id = ObjectId(product_id)
+    quantity = booking.get('quantity')
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+        logger.error("Not returning stock for booking %s: invalid quantity %r", booking['_id'], quantity)
+        return
+
+    claimed = db.bookings.update_one(
+        {'_id': booking['_id'], 'status_transition': token, 'stock_reserved': True},
+        {'$set': {'stock_reserved': False}},
+        session=session
+    )
+    if not claimed.modified_count:
+        return
+    try:
+        release_stock(db, product_id, quantity, session=session)
+    except Exception:
+        if session is not None:
+            raise  # the transaction rolls back both writes
+        logger.exception("Failed to return %s units of product %s for booking %s", quantity, product_id,
+                         booking['_id'])
+        db.bookings.update_one({'_id': booking['_id']}, {'$set': {'stock_reserved': True}})
+
+
+def _transition(db, by_status, to_status, token, session=None):
+    all_ids = []
+    for from_status, ids in by_status.items():
+        all_ids.extend(ids)
+        # Conditional on the status we read, so a booking changed
+        # concurrently is reported as a conflict rather than overwritten
+        db.bookings.update_many(
+            {'_id': {'$in': ids}, 'collection_status': from_status},
+            {'$set': {'collection_status': to_status, 'status_updated_at': datetime.now(timezone.utc),
+                      'status_transition': token}},
+            session=session
+        )
+    # The token marks exactly the bookings this call moved
+    updated = list(db.bookings.find(
+        {'_id': {'$in': all_ids}, 'status_transition': token},
+        {'product_id': 1, 'quantity': 1, 'stock_reserved': 1},
+        session=session
+    ))
+
+    if to_status in RELEASES_STOCK:
+        for booking in updated:
+            if booking.get('stock_reserved'):
+                _return_stock(db, booking, token, session=session)
+    return {booking['_id'] for booking in updated}
+
+
+def transition_bookings(client, db, bookings, to_status, use_transactions=False):
+    """Move bookings to `to_status` in bulk, returning stock where needed.
+
+    `bookings` are documents with at least _id and collection_status.
+    Returns {booking_id: result} where result is 'updated',
+    'invalid_transition' or 'conflict' (changed by someone else meanwhile).
+    """
+    results = {}
+    by_status = {}
+    for booking in bookings:
+        from_status = booking.get('collection_status', 'pending')
+        if to_status in STATUS_TRANSITIONS.get(from_status, ()):
+            by_status.setdefault(from_status, []).append(booking['_id'])
+        else:
+            results[booking['_id']] = 'invalid_transition'
+    if not by_status:
+        return results
+
+    token = ObjectId()
+    if use_transactions:
+        with client.start_session() as session:
+            updated = session.with_transaction(lambda s: _transition(db, by_status, to_status, token, session=s))
+    else:
+        updated = _transition(db, by_status, to_status, token)
+
+    for ids in by_status.values():
+        for booking_id in ids:
+            results[booking_id] = 'updated' if booking_id in updated else 'conflict'
+    return results
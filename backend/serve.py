@@ -0,0 +1,82 @@
+"""Production server entry point.
+
+`app.run(debug=True)` is the single-process development server. This runs
+the same app under gunicorn with several worker processes, each serving
+requests on a pool of threads. Where gunicorn is unavailable (Windows),
+waitress is used with the same thread count.
+
+The I/O-bound routes (product details, bookings) are async views: each
+worker runs them on its own event loop (see aio.py), awaiting MongoDB on
+PyMongo's AsyncMongoClient and Gemini with generate_content_async. A
+request thread only waits for its view to finish; the MongoDB and Gemini
+calls of every in-flight request share the loop rather than each holding
+a pool thread of their own. Async views need pymongo 4.13 or newer.
+
+Settings (environment):
+    APP_ENV           config to run with (default production, see config.py)
+    HOST, PORT        bind address (default 0.0.0.0:5000)
+    WEB_WORKERS       worker processes (default 2 x CPUs + 1)
+    WEB_THREADS       threads per worker (default 8)
+    WEB_TIMEOUT       seconds before a stuck worker is restarted (default 60)
+
+    python serve.py
+"""
+import multiprocessing
+import os
+
+# Never serve the development config (debug mode, a publicly known
+# SECRET_KEY) by accident; production also refuses to start without SECRET_KEY
+os.environ.setdefault("APP_ENV", "production")
+
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", 5000))
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+WEB_THREADS = int(os.environ.get("WEB_THREADS", 8))
+WEB_TIMEOUT = int(os.environ.get("WEB_TIMEOUT", 60))
+
+
+def run_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    class StandaloneApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import create_app, provision_indexes
+            app = create_app()
+            # Once, in the master (preload_app), before any worker serves
+            provision_indexes(app)
+            return app
+
+    StandaloneApplication({
+        'bind': f'{HOST}:{PORT}',
+        'workers': WEB_WORKERS,
+        'threads': WEB_THREADS,
+        'worker_class': 'gthread',
+        'timeout': WEB_TIMEOUT,
+        # Safe because the MongoDB client is created lazily per process
+        'preload_app': True,
+    }).run()
+
+
+def run_waitress():
+    from waitress import serve
+    from app import create_app, provision_indexes
+    app = create_app()
+    provision_indexes(app)
+    serve(app, host=HOST, port=PORT, threads=WEB_THREADS)
+
+
+if __name__ == '__main__':
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        run_waitress()
+    else:
+        run_gunicorn()
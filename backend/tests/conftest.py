@@ -0,0 +1,48 @@
+"""Fixtures: the app on an in-memory MongoDB (mongomock), no mongod needed."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mongomock_clients(monkeypatch):
+    """Point mongo.py at fresh in-memory sync and async clients sharing one server."""
+    pytest.importorskip('mongomock')
+    import mongo
+    import mongomock_async
+    sync_client, async_client = mongomock_async.client_classes()
+    monkeypatch.setattr(mongo, 'MongoClient', sync_client)
+    monkeypatch.setattr(mongo, 'AsyncMongoClient', async_client)
+    return sync_client, async_client
+
+
+@pytest.fixture
+def db(mongomock_clients):
+    return mongomock_clients[0]()['test']
+
+
+@pytest.fixture
+def app(mongomock_clients, monkeypatch):
+    monkeypatch.setenv('APP_ENV', 'testing')
+    from app import create_app
+    app = create_app({'CATALOGUE_SNAPSHOT': 'off', 'DESCRIPTION_CACHE_BACKEND': 'memory', 'MONGO_TRANSACTIONS': False,
+                      'LOG_LEVEL': 'WARNING'})
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_header(app):
+    from auth import issue_token
+
+    def make(user_id, role='customer', krishi_bhavan=None):
+        return {'Authorization': 'Bearer ' + issue_token(user_id, role, krishi_bhavan)}
+    return make
@@ -0,0 +1,97 @@
+import pytest
+from bson import ObjectId
+
+from app import _decode_cursor, _encode_cursor
+
+
+def test_cursor_round_trip():
+    last_id = ObjectId()
+    cursor = _encode_cursor('-price', 12.5, last_id)
+    assert _decode_cursor(cursor, '-price') == (12.5, last_id)
+
+
+def test_cursor_from_another_sort_is_rejected():
+    cursor = _encode_cursor('name', 'Banana', ObjectId())
+    with pytest.raises(ValueError):
+        _decode_cursor(cursor, '-name')
+
+
+def test_products_rejects_a_cursor_from_another_sort(client):
+    cursor = _encode_cursor('name', 'Banana', ObjectId())
+    response = client.get('/products', query_string={'sort': 'price', 'cursor': cursor})
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def product_id(app):
+    db = app.extensions['mongo'].db
+    return db.products.insert_one({'name': 'Nendran', 'price_registered': 40.0, 'stock': 3,
+                                   'krishiBhavan': 'Aluva'}).inserted_id
+
+
+def pre_book(client, headers, product_id, quantity):
+    return client.post('/bookings', headers=headers, json={
+        'product_id': str(product_id), 'quantity': quantity, 'booking_date_time': '2026-01-10T09:00:00Z'})
+
+
+def test_pre_booking_takes_stock_and_prices_from_the_product(app, client, auth_header, product_id):
+    user_id = str(ObjectId())
+    response = pre_book(client, auth_header(user_id), product_id, 2)
+    assert response.status_code == 201
+    db = app.extensions['mongo'].db
+    booking = db.bookings.find_one({'_id': ObjectId(response.get_json()['id'])})
+    assert (booking['total_amount'], booking['krishiBhavan'], booking['stock_reserved']) == (80.0, 'Aluva', True)
+    assert db.products.find_one({'_id': product_id})['stock'] == 1
+
+
+def test_pre_booking_cannot_oversell(app, client, auth_header, product_id):
+    headers = auth_header(str(ObjectId()))
+    assert pre_book(client, headers, product_id, 3).status_code == 201
+    response = pre_book(client, headers, product_id, 1)
+    assert response.status_code == 409
+    assert response.get_json()['product_ids'] == [str(product_id)]
+    db = app.extensions['mongo'].db
+    assert db.products.find_one({'_id': product_id})['stock'] == 0
+    assert db.bookings.count_documents({}) == 1
+
+
+def test_checkout_is_all_or_nothing(app, client, auth_header, product_id):
+    user_id = str(ObjectId())
+    db = app.extensions['mongo'].db
+    scarce = db.products.insert_one({'name': 'Kappa', 'price_registered': 5.0, 'stock': 1}).inserted_id
+    db.cart.insert_many([{'user_id': ObjectId(user_id), 'product_id': product_id, 'quantity': 2},
+                         {'user_id': ObjectId(user_id), 'product_id': scarce, 'quantity': 2}])
+    response = client.post('/bookings/checkout', headers=auth_header(user_id))
+    assert response.status_code == 409
+    assert [p['stock'] for p in db.products.find({}, sort=[('_id', 1)])] == [3, 1]
+    assert db.cart.count_documents({}) == 2
+
+    db.cart.update_one({'product_id': scarce}, {'$set': {'quantity': 1}})
+    response = client.post('/bookings/checkout', headers=auth_header(user_id))
+    assert response.status_code == 201
+    assert response.get_json()['total_amount'] == 85.0
+    assert [p['stock'] for p in db.products.find({}, sort=[('_id', 1)])] == [1, 0]
+    assert db.cart.count_documents({}) == 0
+
+
+def test_seller_cancel_returns_stock(app, client, auth_header, product_id):
+    customer = auth_header(str(ObjectId()))
+    booking_id = pre_book(client, customer, product_id, 2).get_json()['id']
+    seller = auth_header(str(ObjectId()), 'seller', 'Aluva')
+    response = client.post('/seller/bookings/status', headers=seller,
+                           json={'ids': [booking_id], 'status': 'cancelled'})
+    assert response.status_code == 200, response.get_json()
+    db = app.extensions['mongo'].db
+    assert db.products.find_one({'_id': product_id})['stock'] == 3
+    # Cancelling again is refused and returns nothing more
+    client.post('/seller/bookings/status', headers=seller, json={'ids': [booking_id], 'status': 'cancelled'})
+    assert db.products.find_one({'_id': product_id})['stock'] == 3
+
+
+def test_sellers_cannot_touch_another_offices_bookings(app, client, auth_header, product_id):
+    booking_id = pre_book(client, auth_header(str(ObjectId())), product_id, 2).get_json()['id']
+    other_office = auth_header(str(ObjectId()), 'seller', 'Kalady')
+    client.post('/seller/bookings/status', headers=other_office, json={'ids': [booking_id], 'status': 'cancelled'})
+    db = app.extensions['mongo'].db
+    assert db.bookings.find_one()['collection_status'] == 'pending'
+    assert db.products.find_one({'_id': product_id})['stock'] == 1
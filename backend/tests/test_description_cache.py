@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+from description_cache import DescriptionCache, DiskStore, MongoStore
+
+
+def test_concurrent_misses_run_the_factory_once():
+    cache = DescriptionCache()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'detailed_info': 'text'}
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create('key', factory)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [{'detailed_info': 'text'}] * 5
+    assert len(calls) == 1
+    assert cache.get('key') == {'detailed_info': 'text'}
+
+
+def test_a_failed_factory_is_shared_and_not_cached():
+    cache = DescriptionCache()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.2)
+        raise RuntimeError('model failed')
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_create('key', factory)
+        except RuntimeError as e:
+            errors.append(e)
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 4 and len(calls) == 1
+    assert cache.get('key') is None
+
+
+def test_get_or_create_async_single_flight(tmp_path):
+    cache = DescriptionCache(store=DiskStore(str(tmp_path)), version='v1')
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return 'text'
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_create_async('key', factory) for _ in range(5)))
+    assert asyncio.run(run()) == ['text'] * 5
+    assert len(calls) == 1
+    # Written through to the shared store
+    assert DescriptionCache(store=DiskStore(str(tmp_path)), version='v1').get('key') == 'text'
+
+
+def test_get_or_create_async_shares_errors():
+    cache = DescriptionCache()
+
+    async def factory():
+        await asyncio.sleep(0.1)
+        raise RuntimeError('model failed')
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_create_async('key', factory) for _ in range(3)),
+                                    return_exceptions=True)
+    assert [str(e) for e in asyncio.run(run())] == ['model failed'] * 3
+    assert cache.get('key') is None
+
+
+def test_mongo_store_ignores_expired_entries(db):
+    store = MongoStore(lambda: db.product_details_cache)
+    store.set('fresh', 'text', ttl=60)
+    store.set('stale', 'text', ttl=-1)
+    assert store.get('fresh') == 'text'
+    assert store.get('stale') is None
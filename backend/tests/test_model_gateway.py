@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from fake_model import FakeGenerativeModel
+from model_gateway import GatewayBusy, GatewayTimeout, ModelGateway, TokenBucket
+
+
+def test_token_bucket_allows_a_burst_then_the_rate():
+    bucket = TokenBucket(rate=10, burst=3)
+    assert all(bucket.acquire(0) for _ in range(3))
+    assert not bucket.acquire(0)
+    assert bucket.acquire(0.5)  # one token refills in 0.1s
+
+
+def test_token_bucket_pause_hands_out_nothing():
+    bucket = TokenBucket(rate=100, burst=5)
+    bucket.pause(0.2)
+    assert not bucket.acquire(0.1)
+    assert bucket.acquire(0.3)
+
+
+def test_token_bucket_unlimited():
+    bucket = TokenBucket(rate=0, burst=1)
+    assert all(bucket.acquire(0) for _ in range(100))
+
+
+def test_token_bucket_async_acquire():
+    bucket = TokenBucket(rate=10, burst=1)
+    assert asyncio.run(bucket.acquire_async(0))
+    assert not asyncio.run(bucket.acquire_async(0))
+    assert asyncio.run(bucket.acquire_async(0.5))
+
+
+def gateway(model, **kwargs):
+    kwargs.setdefault('rate', 0)
+    return ModelGateway(model, **kwargs)
+
+
+def test_concurrent_identical_prompts_share_one_call():
+    model = FakeGenerativeModel(latency=0.2, chunk_delay=0, text='text')
+    gw = gateway(model)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(gw.generate('prompt'))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['text'] * 5
+    assert model.calls == 1
+
+
+class SlowFailingModel:
+    calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(0.2)
+        raise RuntimeError('model failed')
+
+
+def test_waiters_get_the_leaders_error():
+    model = SlowFailingModel()
+    gw = gateway(model)
+    errors = []
+
+    def call():
+        try:
+            gw.generate('prompt')
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [str(e) for e in errors] == ['model failed'] * 4
+    assert model.calls == 1
+
+
+def test_full_slots_fail_fast():
+    gw = gateway(FakeGenerativeModel(latency=0.5, chunk_delay=0), max_concurrency=1, queue_timeout=0.05)
+    thread = threading.Thread(target=gw.generate, args=('first',))
+    thread.start()
+    time.sleep(0.1)
+    with pytest.raises(GatewayBusy):
+        gw.generate('second')
+    thread.join()
+
+
+def test_slow_model_times_out():
+    gw = gateway(FakeGenerativeModel(latency=0.5, chunk_delay=0), timeout=0.1)
+    with pytest.raises(GatewayTimeout):
+        gw.generate('prompt')
+
+
+def test_quota_error_pauses_calls():
+    model = FakeGenerativeModel(latency=0, chunk_delay=0, quota_error_rate=1.0)
+    gw = ModelGateway(model, rate=100, burst=5, queue_timeout=0, quota_cooldown=60)
+    with pytest.raises(GatewayBusy):
+        gw.generate('first')
+    model.quota_error_rate = 0
+    with pytest.raises(GatewayBusy, match='rate limit'):
+        gw.generate('second')
+    assert model.calls == 1
+
+
+def test_generate_async_coalesces_and_times_out():
+    model = FakeGenerativeModel(latency=0.2, chunk_delay=0, text='text')
+    gw = gateway(model, timeout=1)
+
+    async def run():
+        return await asyncio.gather(*(gw.generate_async('prompt') for _ in range(5)))
+    assert asyncio.run(run()) == ['text'] * 5
+    assert model.calls == 1
+
+    slow = gateway(FakeGenerativeModel(latency=0.5, chunk_delay=0), timeout=0.1)
+    with pytest.raises(GatewayTimeout):
+        asyncio.run(slow.generate_async('prompt'))
+    # The timed-out call gave its slot back
+    assert slow._slots.acquire(blocking=False)
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from reservations import (InvalidQuantity, OutOfStock, ProductNotFound, book_items, book_items_async, reserve_stock,
+                          transition_bookings)
+
+
+def make_booking(product, quantity):
+    return {'product_id': str(product['_id']), 'quantity': quantity, 'collection_status': 'pending',
+            'stock_reserved': True}
+
+
+def add_product(db, stock):
+    return db.products.insert_one({'name': 'Nendran', 'stock': stock}).inserted_id
+
+
+def stock(db, product_id):
+    return db.products.find_one({'_id': product_id})['stock']
+
+
+def test_reserve_stock_takes_units(db):
+    product_id = add_product(db, 5)
+    assert reserve_stock(db, product_id, 2)['stock'] == 3
+    assert stock(db, product_id) == 3
+
+
+def test_reserve_stock_never_oversells(db):
+    product_id = add_product(db, 2)
+    reserve_stock(db, product_id, 2)
+    with pytest.raises(OutOfStock):
+        reserve_stock(db, product_id, 1)
+    assert stock(db, product_id) == 0
+
+
+@pytest.mark.parametrize('quantity', [0, -1, True, '2', 1.5])
+def test_reserve_stock_rejects_bad_quantities(db, quantity):
+    product_id = add_product(db, 5)
+    with pytest.raises(InvalidQuantity):
+        reserve_stock(db, product_id, quantity)
+    assert stock(db, product_id) == 5
+
+
+def test_reserve_stock_unknown_product(db):
+    with pytest.raises(ProductNotFound):
+        reserve_stock(db, ObjectId(), 1)
+
+
+def test_book_items_releases_earlier_items_when_one_is_out_of_stock(db):
+    plenty, scarce = add_product(db, 10), add_product(db, 1)
+    with pytest.raises(OutOfStock) as excinfo:
+        book_items(None, db, [(plenty, 3), (scarce, 2)], make_booking)
+    assert excinfo.value.product_ids == [str(scarce)]
+    assert stock(db, plenty) == 10
+    assert stock(db, scarce) == 1
+    assert db.bookings.count_documents({}) == 0
+
+
+def test_book_items_releases_stock_when_the_insert_fails(db, monkeypatch):
+    product_id = add_product(db, 4)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('insert failed')
+    monkeypatch.setattr(type(db.bookings), 'insert_many', fail)
+    with pytest.raises(RuntimeError):
+        book_items(None, db, [(product_id, 3)], make_booking)
+    assert stock(db, product_id) == 4
+
+
+def test_book_items_books_every_item(db):
+    first, second = add_product(db, 2), add_product(db, 3)
+    bookings = book_items(None, db, [(second, 3), (first, 1)], make_booking)
+    assert [booking['quantity'] for booking in bookings] == [1, 3]  # reserved in _id order
+    assert (stock(db, first), stock(db, second)) == (1, 0)
+    assert db.bookings.count_documents({'stock_reserved': True}) == 2
+
+
+def test_book_items_async_compensates_like_book_items(mongomock_clients):
+    sync_client, async_client = mongomock_clients
+    db = sync_client()['test']
+    plenty, scarce = add_product(db, 10), add_product(db, 1)
+
+    async def book(items):
+        return await book_items_async(None, async_client()['test'], items, make_booking)
+
+    with pytest.raises(OutOfStock):
+        asyncio.run(book([(plenty, 3), (scarce, 2)]))
+    assert (stock(db, plenty), stock(db, scarce)) == (10, 1)
+    assert db.bookings.count_documents({}) == 0
+
+    assert len(asyncio.run(book([(plenty, 3), (scarce, 1)]))) == 2
+    assert (stock(db, plenty), stock(db, scarce)) == (7, 0)
+
+
+def book(db, product_id, quantity, status='pending', **fields):
+    booking = {'product_id': str(product_id), 'quantity': quantity, 'collection_status': status,
+               'stock_reserved': True, **fields}
+    db.bookings.insert_one(booking)
+    return booking
+
+
+@pytest.mark.parametrize('to_status', ['cancelled', 'expired'])
+def test_cancelling_or_expiring_returns_stock_once(db, to_status):
+    product_id = add_product(db, 0)
+    booking = book(db, product_id, 3)
+    assert transition_bookings(None, db, [booking], to_status) == {booking['_id']: 'updated'}
+    assert stock(db, product_id) == 3
+    assert db.bookings.find_one({'_id': booking['_id']})['stock_reserved'] is False
+
+    # A retry with the stale document is now an invalid transition, not a second release
+    reread = db.bookings.find_one({'_id': booking['_id']})
+    assert transition_bookings(None, db, [reread], to_status) == {booking['_id']: 'invalid_transition'}
+    assert transition_bookings(None, db, [booking], to_status) == {booking['_id']: 'conflict'}
+    assert stock(db, product_id) == 3
+
+
+def test_collecting_keeps_stock_taken(db):
+    product_id = add_product(db, 0)
+    booking = book(db, product_id, 2, status='confirmed')
+    assert transition_bookings(None, db, [booking], 'collected') == {booking['_id']: 'updated'}
+    assert stock(db, product_id) == 0
+    assert transition_bookings(None, db, [db.bookings.find_one()], 'cancelled') == {
+        booking['_id']: 'invalid_transition'}
+    assert stock(db, product_id) == 0
+
+
+def test_bookings_made_before_reservations_get_no_stock_back(db):
+    product_id = add_product(db, 0)
+    booking = book(db, product_id, 2)
+    db.bookings.update_one({'_id': booking['_id']}, {'$unset': {'stock_reserved': ''}})
+    assert transition_bookings(None, db, [booking], 'cancelled') == {booking['_id']: 'updated'}
+    assert stock(db, product_id) == 0
+
+
+def test_concurrent_change_is_a_conflict(db):
+    product_id = add_product(db, 0)
+    booking = book(db, product_id, 2)
+    db.bookings.update_one({'_id': booking['_id']}, {'$set': {'collection_status': 'collected'}})
+    # The caller still thinks it is pending
+    assert transition_bookings(None, db, [booking], 'cancelled') == {booking['_id']: 'conflict'}
+    assert stock(db, product_id) == 0
@@ -0,0 +1,151 @@
+"""Crop varieties shown on the product details page.
+
+Varieties live in the `varieties` collection, one document per variety:
+
+    {id, name, type, image, description, version}
+
+`id` is the integer the frontend links to, and `version` goes up each
+time an import changes the record. Each worker keeps an in-process
+index by id and by type. A counter in the `counters` collection (bumped
+on every import) tells the other workers to reload.
+
+An empty collection is seeded from varieties.json on first use. More
+varieties can be added without a redeploy:
+
+    flask --app app import-varieties new_varieties.csv
+"""
+import csv
+import json
+import logging
+import os
+import threading
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+VARIETY_FIELDS = ('id', 'name', 'type', 'image', 'description')
+SEED_FILE = os.path.join(os.path.dirname(__file__), 'varieties.json')
+DUPLICATE_KEY = 11000
+
+
+def load_records(path):
+    """Read varieties from a JSON list or a CSV file with a header row."""
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            records = list(csv.DictReader(f))
+        else:
+            records = json.load(f)
+    return [normalize_record(record, index) for index, record in enumerate(records, start=1)]
+
+
+def normalize_record(record, index=None):
+    where = f'record {index}' if index is not None else 'record'
+    try:
+        variety_id = int(record['id'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"{where}: id must be an integer")
+    if not record.get('name') or not record.get('type'):
+        raise ValueError(f"{where}: name and type are required")
+    return {
+        'id': variety_id,
+        'name': str(record['name']).strip(),
+        'type': str(record['type']).strip(),
+        'image': record.get('image') or '',
+        'description': record.get('description') or '',
+    }
+
+
+class VarietyStore:
+    def __init__(self, get_collection, version):
+        self.get_collection = get_collection
+        self.version = version  # http_cache.CatalogueVersion for the varieties counter
+        self._loaded_version = None
+        self._by_id = {}
+        self._by_type = {}  # lower-cased type -> varieties ordered by id
+        self._lock = threading.Lock()
+
+    def reset(self):
+        self._loaded_version = None
+
+    def _ensure_current(self):
+        version = self.version.get()
+        if version == self._loaded_version:
+            return
+        with self._lock:
+            if version != self._loaded_version:
+                self._loaded_version = self._load(version)
+
+    def _load(self, version):
+        """Load every variety; returns the counter version the loaded data is current for."""
+        collection = self.get_collection()
+        varieties = list(collection.find({}, {'_id': 0}).sort('id', ASCENDING))
+        if not varieties and os.path.exists(SEED_FILE):
+            self._seed()
+            # Seeding bumped the counter; read it before the data so this
+            # worker doesn't reload its own seed on the next request
+            version = self.version.get()
+            varieties = list(collection.find({}, {'_id': 0}).sort('id', ASCENDING))
+        by_type = {}
+        for variety in varieties:
+            by_type.setdefault(variety['type'].lower(), []).append(variety)
+        self._by_id = {variety['id']: variety for variety in varieties}
+        self._by_type = by_type
+        logger.info("Loaded %d varieties", len(varieties))
+        return version
+
+    def _seed(self):
+        try:
+            self.import_varieties(load_records(SEED_FILE))
+        except BulkWriteError as e:
+            # Another worker seeded the empty collection at the same moment
+            # and won the race on the unique id index; its records are ours
+            if any(error.get('code') != DUPLICATE_KEY for error in e.details.get('writeErrors', [])):
+                raise
+            logger.info("Varieties were seeded by another worker")
+
+    def get(self, variety_id):
+        self._ensure_current()
+        return self._by_id.get(variety_id)
+
+    def list(self, variety_type=None, q=None):
+        self._ensure_current()
+        if variety_type:
+            varieties = self._by_type.get(variety_type.lower(), [])
+        else:
+            varieties = list(self._by_id.values())
+        if q:
+            needle = q.lower()
+            varieties = [v for v in varieties if needle in v['name'].lower() or needle in v['description'].lower()]
+        return varieties
+
+    def types(self):
+        self._ensure_current()
+        return [{'type': varieties[0]['type'], 'count': len(varieties)} for varieties in self._by_type.values()]
+
+    def import_varieties(self, records):
+        """Upsert normalized records by id, bumping `version` only on those that changed.
+
+        Returns (inserted, updated, unchanged) counts.
+        """
+        collection = self.get_collection()
+        existing = {
+            variety['id']: variety
+            for variety in collection.find({'id': {'$in': [record['id'] for record in records]}}, {'_id': 0})
+        }
+        operations = []
+        inserted = updated = 0
+        for record in records:
+            current = existing.get(record['id'])
+            if current is not None and all(current.get(field) == record[field] for field in VARIETY_FIELDS):
+                continue
+            if current is None:
+                inserted += 1
+            else:
+                updated += 1
+            operations.append(UpdateOne({'id': record['id']}, {'$set': record, '$inc': {'version': 1}}, upsert=True))
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+            self.version.bump()
+        return inserted, updated, len(records) - len(operations)
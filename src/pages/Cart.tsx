@@ -24,10 +24,8 @@ export const Cart = () => {
 
     setIsProcessing(true);
     try {
-      const totalAmount = calculateTotal();
-      console.log('Total Amount:', totalAmount);
       for (const item of cartItems) {
-        await preBookNow(item.product, item.quantity, item.office, totalAmount);
+        await preBookNow(item.product, item.quantity);
       }
       
       // Clear cart after successful pre-booking
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { User, MapPin, Phone, Mail, Package, Clock, CheckCircle, XCircle, Loader2, AlertCircle } from 'lucide-react';
-import { useAuthStore } from '../store/authStore';
+import { useAuthStore, authHeaders } from '../store/authStore';
 import { format } from 'date-fns';
 import type { Booking } from '../types';
 
@@ -27,7 +27,9 @@ export const Profile = () => {
 
     const fetchBookings = async () => {
       try {
-        const response = await fetch(`http://localhost:5000/bookings?user_id=${user.id}`);
+        const response = await fetch(`http://localhost:5000/bookings?user_id=${user.id}`, {
+          headers: authHeaders(),
+        });
         const data = await response.json();
         if (!response.ok) throw new Error(data.error || 'Failed to fetch bookings');
         setBookings(data);
@@ -70,6 +72,7 @@ export const Profile = () => {
         method: 'PUT',
         headers: {
           'Content-Type': 'application/json',
+          ...authHeaders(),
         },
         body: JSON.stringify({
           userId: user.id,
@@ -12,6 +12,7 @@ export const Register = () => {
     pincode: '',
     password: '',
     confirmPassword: '',
+    // Seller accounts are set up by an administrator
     role: 'customer' as 'customer' | 'seller'
   });
   const [errors, setErrors] = useState<Record<string, string>>({});
@@ -208,22 +209,6 @@ export const Register = () => {
               {errors.pincode && <p className="mt-1 text-sm text-red-600">{errors.pincode}</p>}
             </div>
 
-            <div>
-              <label htmlFor="role" className="block text-sm font-medium text-gray-700 mb-2">
-                Account Type
-              </label>
-              <select
-                id="role"
-                name="role"
-                value={formData.role}
-                onChange={handleChange}
-                className="w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-green-500 focus:border-transparent"
-              >
-                <option value="customer">Customer</option>
-                <option value="seller">Seller (Krishi-Bahavan Office)</option>
-              </select>
-            </div>
-
             <div>
               <label htmlFor="password" className="block text-sm font-medium text-gray-700 mb-2">
                 Password
@@ -2,6 +2,7 @@ import { useEffect, useState } from 'react';
 import { Plus, Pencil, Trash2, Package, TrendingUp, Users, AlertCircle, CheckCircle, Clock, Search } from 'lucide-react';
 import type { Product, Booking } from '../types';
 import { format } from 'date-fns';
+import { authHeaders } from '../store/authStore';
 
 const stats = [
   { name: 'Total Products', value: '24', icon: Package, color: 'bg-blue-500' },
@@ -12,7 +13,6 @@ const stats = [
 
 export const SellerDashboard = () => {
   const [products, setProducts] = useState<Product[]>([]);
-const userType = localStorage.getItem("userType") || "unregistered"; // Assume userType is stored in localStorage
   const [formData, setFormData] = useState<Pick<Product, 'name' | 'description' | "price_registered" | "price_unregistered" | 'stock' | 'category' | 'krishiBhavan' | 'imageUrl'>>({
     name: '',
     description: '',
@@ -33,7 +33,7 @@ const userType = localStorage.getItem("userType") || "unregistered"; // Assume u
   // Fetch products from MongoDB when the component mounts
   const fetchProducts = async () => {
     try {
-      const response = await fetch(`http://localhost:5000/products?user_type=${userType}`);
+      const response = await fetch('http://localhost:5000/products'); // both prices: the dashboard shows and edits them
       if (!response.ok) throw new Error("Failed to fetch products");
       
       const data = await response.json();
@@ -44,7 +44,7 @@ const userType = localStorage.getItem("userType") || "unregistered"; // Assume u
   };
   
   useEffect(() => {
-    fetch("http://127.0.0.1:5000/products?user_type=unregistered")
+    fetch("http://127.0.0.1:5000/products")
       .then((response) => response.json())
       .then((data) => {
         console.log("Fetched products:", data); // Debugging: Check API response
@@ -72,7 +72,7 @@ const userType = localStorage.getItem("userType") || "unregistered"; // Assume u
       if (selectedProduct) {
         response = await fetch(`http://localhost:5000/products/${selectedProduct.id}`, {
           method: 'PUT',
-          headers: { 'Content-Type': 'application/json' },
+          headers: { 'Content-Type': 'application/json', ...authHeaders() },
           body: JSON.stringify(formData),
         });
   
@@ -80,7 +80,7 @@ const userType = localStorage.getItem("userType") || "unregistered"; // Assume u
       } else {
         response = await fetch('http://localhost:5000/products', {
           method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
+          headers: { 'Content-Type': 'application/json', ...authHeaders() },
           body: JSON.stringify(formData),
         });
   
@@ -127,6 +127,7 @@ const userType = localStorage.getItem("userType") || "unregistered"; // Assume u
     try {  
       const response = await fetch(`http://localhost:5000/products/${productId}`, {
         method: 'DELETE',
+        headers: authHeaders(),
       });
   
       if (!response.ok) throw new Error('Failed to delete product');
@@ -23,6 +23,7 @@ export const useAuthStore = create<AuthState & {
   persist(
     (set) => ({
       user: null,
+      token: null,
       isAuthenticated: false,
       isLoading: false,
       error: null,
@@ -42,7 +43,7 @@ export const useAuthStore = create<AuthState & {
             role: response.data.role
           };
 
-          set({ user, isAuthenticated: true, isLoading: false });
+          set({ user, token: response.data.token, isAuthenticated: true, isLoading: false });
         } catch (error) {
           console.error("❌ Error: ", error);
           set({ error: 'Invalid credentials', isLoading: false });
@@ -60,10 +61,10 @@ export const useAuthStore = create<AuthState & {
             phone: data.phone,
             address: data.address,
             pincode: data.pincode,
-            role: data.role
+            role: response.data.role
           };
 
-          set({ user, isAuthenticated: true, isLoading: false });
+          set({ user, token: response.data.token, isAuthenticated: true, isLoading: false });
         } catch (error) {
           console.error("❌ Error: ", error);
           set({ error: 'Registration failed. Please try again.', isLoading: false });
@@ -71,7 +72,7 @@ export const useAuthStore = create<AuthState & {
       },
 
       logout: () => {
-        set({ user: null, isAuthenticated: false, error: null });
+        set({ user: null, token: null, isAuthenticated: false, error: null });
       },
 
       clearError: () => {
@@ -88,4 +89,10 @@ export const useAuthStore = create<AuthState & {
       skipHydration: false,
     }
   )
-);
\ No newline at end of file
+);
+
+// Authorization header for the signed-in user's cart, booking and profile requests
+export const authHeaders = (): Record<string, string> => {
+  const { token } = useAuthStore.getState();
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
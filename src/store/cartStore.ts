@@ -1,19 +1,34 @@
 import { create } from 'zustand';
 import type { CartItem, Product, Office } from '../types';
 import axios from 'axios';
-import { useAuthStore } from './authStore'; // Import the auth store
+import { useAuthStore, authHeaders } from './authStore'; // Import the auth store
 
 interface CartStore {
   items: CartItem[];
+  // Lines changed here but not yet sent to the server
+  pendingOps: Record<string, 'update' | 'remove'>;
   addItem: (product: Product, quantity: number, office: Office) => void;
   removeItem: (productId: string) => void;
   updateQuantity: (productId: string, quantity: number) => void;
   clearCart: () => void;
-  preBookNow: (product: Product, quantity: number, office: Office, totalAmount: number) => void;
+  preBookNow: (product: Product, quantity: number) => void;
+  syncCart: () => Promise<void>;
 }
 
-export const useCartStore = create<CartStore>((set) => ({
+// Quantity changes and removals are sent in one batch once the user pauses
+const SYNC_DELAY_MS = 500;
+let syncTimer: ReturnType<typeof setTimeout> | undefined;
+
+const scheduleSync = () => {
+  clearTimeout(syncTimer);
+  syncTimer = setTimeout(() => {
+    useCartStore.getState().syncCart().catch(error => console.error('Failed to sync cart:', error));
+  }, SYNC_DELAY_MS);
+};
+
+export const useCartStore = create<CartStore>((set, get) => ({
   items: [],
+  pendingOps: {},
   addItem: async (product, quantity, office) => {
     const { user } = useAuthStore.getState(); // Get the user from the auth store
     const userId = user.id;
@@ -40,71 +55,82 @@ export const useCartStore = create<CartStore>((set) => ({
       user_id: userId,
       product_id: product.id,
       quantity
-    });
+    }, { headers: authHeaders() });
   },
-  removeItem: async (productId) => {
-    const { user } = useAuthStore.getState(); // Get the user from the auth store
-    const userId = user.id;
-
+  removeItem: (productId) => {
     set((state) => ({
-      items: state.items.filter(item => item.product.id !== productId)
+      items: state.items.filter(item => item.product.id !== productId),
+      pendingOps: { ...state.pendingOps, [productId]: 'remove' }
     }));
-
-    await axios.delete('http://localhost:5000/cart', {
-      data: {
-        user_id: userId,
-        product_id: productId
-      }
-    });
+    scheduleSync();
   },
-  updateQuantity: async (productId, quantity) => {
-    const { user } = useAuthStore.getState(); // Get the user from the auth store
-    const userId = user.id;
-
+  updateQuantity: (productId, quantity) => {
     set((state) => ({
       items: state.items.map(item =>
         item.product.id === productId
           ? { ...item, quantity: Math.max(1, Math.min(quantity, item.product.stock)) }
           : item
-      )
+      ),
+      pendingOps: { ...state.pendingOps, [productId]: 'update' }
     }));
-
-    await axios.put('http://localhost:5000/cart', {
-      user_id: userId,
-      product_id: productId,
-      quantity
-    });
+    scheduleSync();
   },
   clearCart: async () => {
     const { user } = useAuthStore.getState(); // Get the user from the auth store
     const userId = user.id;
 
-    set({ items: [] });
+    // Clearing supersedes any changes still waiting to be sent
+    clearTimeout(syncTimer);
+    set({ items: [], pendingOps: {} });
 
     await axios.delete('http://localhost:5000/cart/clear', {
+      headers: authHeaders(),
       data: { user_id: userId }
     });
   },
-  preBookNow: async (product, quantity, office, totalAmount) => {
+  preBookNow: async (product, quantity) => {
     const { user } = useAuthStore.getState(); // Get the user from the auth store
     const userId = user.id;
     const bookingDateTime = new Date().toISOString(); // Current date and time
     
+    // Name, office and amount are filled in by the server from the product
     const bookingData = {
       user_id: userId,
-      product_name: product.name,
       product_id: product.id,
       quantity,
-      krishiBhavan: office.name,
-      booking_date_time: bookingDateTime,
-      total_amount: totalAmount,
-      collection_status: 'pending'
+      booking_date_time: bookingDateTime
     };
 
     console.log("Booking data being sent:", bookingData); // Log the data being sent
 
-    await axios.post('http://localhost:5000/bookings', bookingData);
+    await axios.post('http://localhost:5000/bookings', bookingData, { headers: authHeaders() });
 
     // Update product stock after pre-booking
+  },
+  syncCart: async () => {
+    const { user } = useAuthStore.getState(); // Get the user from the auth store
+    const userId = user.id;
+    const { items, pendingOps } = get();
+    const productIds = Object.keys(pendingOps);
+    if (productIds.length === 0) return;
+    set({ pendingOps: {} });
+
+    // Push every pending change in one request instead of one request per click
+    const operations = productIds.map(productId => {
+      const item = items.find(line => line.product.id === productId);
+      return pendingOps[productId] === 'remove' || !item
+        ? { op: 'remove', product_id: productId }
+        : { op: 'update', product_id: productId, quantity: item.quantity };
+    });
+    try {
+      await axios.post('http://localhost:5000/cart/batch', {
+        user_id: userId,
+        operations
+      }, { headers: authHeaders() });
+    } catch (error) {
+      // Keep the changes for the next sync; newer ones win
+      set((state) => ({ pendingOps: { ...pendingOps, ...state.pendingOps } }));
+      throw error;
+    }
   }
 }));
\ No newline at end of file
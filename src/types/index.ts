@@ -28,7 +28,7 @@ export interface Booking {
   krishiBhavan: string;
   booking_date_time: Date;
   total_amount: number;
-  collection_status: 'pending' | 'confirmed' | 'collected' | 'expired';
+  collection_status: 'pending' | 'confirmed' | 'collected' | 'cancelled' | 'expired';
 }
 
 export interface CartItem {
@@ -49,6 +49,7 @@ export interface User {
 
 export interface AuthState {
   user: User | null;
+  token: string | null;
   isAuthenticated: boolean;
   isLoading: boolean;
   error: string | null;